@@ -19,68 +19,1904 @@ v0.9
   - replace handleTriggerQuery with items generator method
   - replace makeImageIcon with Icon.image static method
   - rename query.string to context.query
+v0.10
+  - reload recent items and projects in background when their files change
+  - load the index in background on startup, from a snapshot of the last session
+  - read git worktrees from .git/worktrees, fallback to parallel `git worktree list --porcelain` with timeout
+  - search in a trigram index built at load time, instead of scanning all the items on each query
+  - narrow the results of the previous query when the query is extended while typing
+  - rank results by match quality, with fuzzy matching of the names when there are few substring matches
+  - rank frequently and recently opened items first, launches are logged in the plugin data directory
+  - check project paths existence in background, so unmounted storages can't freeze queries
+  - read the full recent items history from the editor state database (state.vscdb)
+  - add optional latency statistics, shown by the `:stats` query
+  - precompute the items display strings at load time, and reuse the built items between queries
+  - stream the results in batches, the first one is yielded before ranking the others
+  - index all the installed editors in background, changing the mode only switches the index used
+  - add an "All editors" mode, merging the items of all the installed editors
+  - match the recent workspaces by the names of their folders, read from the .code-workspace files
+  - search the files of a project or recent folder with `vs project/ fragment`, indexed in background
+  - add optional git status of the projects (branch, changes, ahead/behind, last commit), read in background
+  - keep the indexed projects and recent items as compact entries, sharing their directories and tags
+  - read only the needed keys of storage.json, and only when it changed
+  - classify remote entries at load time: no filesystem access, readable subtext, remote hosts searchable
 """
 
+import heapq
 import json
+import math
+import mmap
+import os
+import queue
+import re
+import sqlite3
 import subprocess
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from contextlib import nullcontext
 from pathlib import Path
 from shutil import which
-from typing import Generator, List, Literal, Tuple
+from urllib.parse import quote, unquote, urlsplit
+from typing import AbstractSet, Any, Callable, Dict, Generator, Iterable, Iterator, List, Literal, NamedTuple, Optional, Sequence, Tuple
 from albert import *
 
 md_name = "Visual Studio Code"
 md_iid = "5.0"
 md_description = "Open & search recent Visual Studio Code files and folders."
-md_version = "0.9"
+md_version = "0.10"
 md_authors = ["@mparati31", "@bierchermuesli", "@noah-boeckmann"]
 md_url = "https://github.com/mparati31/albert-vscode"
 md_license = "unknown license"
 
+# Filters selecting the type of the recent items
+RECENT_TYPE_FILTERS = ("file", "folder")
+
+# Editor configurations
+EDITORS = {
+    "VSCode": {
+        "icon_prefix": "icon",
+        "config_dir": "Code",
+        "executable": "code"
+    },
+    "VSCode - Insiders": {
+        "icon_prefix": "insiders",
+        "config_dir": "Code - Insiders",
+        "executable": "code-insiders"
+    },
+    "VSCodium": {
+        "icon_prefix": "codium-icon",
+        "config_dir": "VSCodium",
+        "executable": "codium"
+    },
+    "VSCodium - Insiders": {
+        "icon_prefix": "codium-insiders-icon",
+        "config_dir": "VSCodium - Insiders",
+        "executable": "codium-insiders"
+    },
+    "Cursor": {
+        "icon_prefix": "cursor-icon",
+        "config_dir": "Cursor",
+        "executable": ["cursor", "cursor.AppImage"]
+    },
+    "Windsurf": {
+        "icon_prefix": "windsurf-icon",
+        "config_dir": "Windsurf",
+        "executable": "windsurf"
+    },
+    "Windsurf - Next": {
+        "icon_prefix": "windsurf-next-icon",
+        "config_dir": "Windsurf - Next",
+        "executable": "windsurf-next"
+    }
+}
+# Mode showing the items of all the installed editors, each one opened in the editor it comes from
+ALL_EDITORS = "All editors"
+
+
+# Names of the `vscode-remote` authorities kinds, as shown by the editor
+REMOTE_NAMES = {
+    "ssh-remote": "SSH",
+    "wsl": "WSL",
+    "dev-container": "Dev Container",
+    "attached-container": "Container",
+    "codespaces": "Codespaces",
+    "tunnel": "Tunnel",
+}
+# Scheme of a URI, local paths have none. Single letters are Windows drives, not schemes.
+URI_SCHEME = re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]+:")
+
+
+# Returns the remote of a path or URI as shown in the items, e.g. "SSH: host", or None if it is local.
+def uri_remote(path: str) -> Optional[str]:
+    scheme = URI_SCHEME.match(path)
+    if scheme is None or scheme.group() == "file:":
+        return None
+    authority = urlsplit(path).netloc
+    if scheme.group() == "vscode-remote:":
+        kind, _, host = unquote(authority).partition("+")
+        # Containers hosts are hex encoded configurations, not readable
+        if kind in ("dev-container", "attached-container"):
+            host = ""
+        name = REMOTE_NAMES.get(kind, kind)
+        return f"{name}: {host}" if host else name
+    return f"{scheme.group()} {unquote(authority)}" if authority else scheme.group()[:-1]
+
+
+# Returns the URI of a project root path, paths without a scheme are local files.
+def project_uri(path: str) -> str:
+    if path and '://' not in path and not path.startswith(('vscode:', 'file:')):
+        return f"file://{path}"
+    return path
+
+
+# Returns the URI of a recent item path, remote items are already URIs.
+def path_to_uri(path: str) -> str:
+    if '://' in path:
+        return path
+    if path.startswith('/'):
+        # Same as Path.as_uri for absolute paths, much faster on large histories
+        return 'file://' + quote(path)
+    # Relative paths can't be converted
+    return project_uri(path)
+
+
+# Returns the local path of a `file:` URI, other URIs are returned as is.
+def uri_to_path(uri: str) -> str:
+    if uri.startswith("file://"):
+        return unquote(urlsplit(uri).path)
+    return uri
+
+
+# Returns the path of a URI object of the File > Open Recent menu, e.g. {"scheme": "file", "path": "/home"}.
+# Other schemes are returned as URIs, so the items are remote.
+def menubar_uri_to_path(uri: dict) -> str:
+    scheme = uri.get("scheme", "file")
+    if scheme == "file":
+        return uri["path"]
+    return f"{scheme}://{quote(uri.get('authority', ''), safe='')}{quote(uri['path'])}"
+
+
+# Strings are matched first, so comments and commas inside them are kept
+JSONC_COMMENTS = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+JSONC_TRAILING_COMMAS = re.compile(r'("(?:\\.|[^"\\])*")|,(?=\s*[\]}])')
+
+
+# Returns the JSON text of a JSON with comments text (JSONC), the format of the editor settings and
+# workspace files: comments and trailing commas are removed.
+def strip_jsonc(text: str) -> str:
+    text = JSONC_COMMENTS.sub(lambda match: match.group(1) or "", text)
+    return JSONC_TRAILING_COMMAS.sub(lambda match: match.group(1) or "", text)
+
+
+# Returns (mtime, size) of `path`, or None if it can't be stat'ed.
+def file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Returns a duration in seconds as "3 days ago".
+def format_age(seconds: float) -> str:
+    units = (("year", 31536000), ("month", 2592000), ("week", 604800), ("day", 86400), ("hour", 3600), ("minute", 60))
+    for unit, length in units:
+        if seconds >= length:
+            count = int(seconds // length)
+            return f"{count} {unit}{'s' if count > 1 else ''} ago"
+    return "just now"
+
+
+# Timer returned when the statistics are disabled, shared to not allocate one per call
+NULL_TIMER = nullcontext()
+
+
+# Rolling latency histograms and counters of the plugin hot paths.
+# When disabled, recording costs a single attribute check.
+class Stats:
+    # Number of samples kept for each timing
+    WINDOW = 1000
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._timings: Dict[str, deque] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        if self.enabled:
+            with self._lock:
+                self._timings.setdefault(name, deque(maxlen=self.WINDOW)).append(seconds)
+
+    def count(self, name: str, value: int = 1):
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    # Returns a context manager timing its block.
+    def timer(self, name: str):
+        return StatsTimer(self, name) if self.enabled else NULL_TIMER
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    # Returns {"timings": {name: {count, p50, p95, max}}, "counters": {name: value}}, durations in milliseconds.
+    def summary(self) -> dict:
+        with self._lock:
+            timings = {name: sorted(samples) for name, samples in self._timings.items()}
+            counters = dict(self._counters)
+        return {
+            "timings": {
+                name: {
+                    "count": len(samples),
+                    "p50": samples[len(samples) // 2] * 1000,
+                    "p95": samples[min(len(samples) - 1, len(samples) * 95 // 100)] * 1000,
+                    "max": samples[-1] * 1000,
+                }
+                for name, samples in sorted(timings.items()) if samples
+            },
+            "counters": dict(sorted(counters.items())),
+        }
+
+
+class StatsTimer:
+    def __init__(self, stats: Stats, name: str):
+        self._stats = stats
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stats.add(self._name, time.perf_counter() - self._start)
+        return False
+
+
+# Value loaded from files on disk, that is reloaded in background when they change.
+# Readers always get the last loaded value, they never wait for a reload. `on_loaded` is only called
+# when the loaded value differs from the previous one.
+class CachedSource:
+    # Minimal delay between two checks of the files signature
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, name: str, paths: Callable[[], List[Path]], loader: Callable[[], Any], default: Any,
+                 on_loaded: Optional[Callable[[], None]] = None, stats: Optional[Stats] = None):
+        self.name = name
+        self.value = default
+        self._paths = paths
+        self._loader = loader
+        self._on_loaded = on_loaded
+        self._stats = stats or Stats()
+        self._signature = None
+        self._checked_at = 0.0
+        self._reloading = False
+        self._pending = False
+        self._lock = threading.Lock()
+
+    def signature(self) -> tuple:
+        return tuple(file_signature(path) for path in self._paths())
+
+    # Starts a background reload if the files changed since the last load.
+    # Returns True if a reload was started.
+    def refresh(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+
+        signature = self.signature()
+        if not force and signature == self._signature:
+            return False
+
+        with self._lock:
+            if self._reloading:
+                # A forced reload must not be lost, the running one could use outdated settings
+                self._pending = self._pending or force
+                return False
+            self._reloading = True
+        threading.Thread(target=self._reload, args=(signature,), name=f"vscode-{self.name}", daemon=True).start()
+        return True
+
+    # Loads the value synchronously.
+    def reload(self):
+        with self._lock:
+            self._reloading = True
+        self._reload(self.signature())
+
+    # Returns the value and the signature of the files it was loaded from, in a JSON serializable form.
+    def snapshot(self) -> dict:
+        return {"signature": self._signature, "value": self.value}
+
+    # Restores a value saved by `snapshot`. It is reloaded on the next refresh if the files changed since.
+    def restore(self, snapshot: dict):
+        signature = snapshot["signature"]
+        self.value = snapshot["value"]
+        self._signature = tuple(tuple(item) if item is not None else None for item in signature) if signature else None
+
+    def _reload(self, signature: tuple):
+        while True:
+            changed = False
+            try:
+                with self._stats.timer(f"reload {self.name}"):
+                    value = self._loader()
+                changed = value is not self.value and value != self.value
+                # Swap the whole value at once, so readers never see a partial state
+                self.value = value
+            except Exception as e:
+                warning(f"Failed to load {self.name}: {str(e)}")
+            # Remember the signature even on failure, to not retry until the files change again
+            self._signature = signature
+            if changed and self._on_loaded:
+                self._on_loaded()
+            elif not changed and self._stats.enabled:
+                self._stats.count(f"reload {self.name} unchanged")
+
+            with self._lock:
+                if not self._pending:
+                    self._reloading = False
+                    return
+                self._pending = False
+            signature = self.signature()
+
+
+# Log of the launched items, giving them a frequency score that decays over time.
+# Launches are appended to a file, that is compacted to one line per item when it grows.
+class FrecencyLog:
+    # Time after which the weight of a launch is halved
+    HALF_LIFE = 14 * 24 * 3600
+    # Scores below this are dropped on compaction
+    MIN_SCORE = 0.01
+    COMPACT_MIN_LINES = 200
+
+    def __init__(self, path: Path):
+        self._path = path
+        # Score of each key at the time of its last launch
+        self._scores: Dict[str, Tuple[float, float]] = {}
+        self._lines = 0
+        self._loaded = False
+        self._loading = False
+        self._compacting = False
+        self._lock = threading.Lock()
+        # Incremented on each change of the scores
+        self.version = 0
+
+    # Starts loading the log in background if it isn't loaded yet, scores are 0 meanwhile.
+    # A single thread loads it, however many queries run meanwhile.
+    def load_async(self):
+        # Checked first without the lock, which the loading thread holds while reading
+        if self._loaded or self._loading:
+            return
+        with self._lock:
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._load, name="vscode-frecency", daemon=True).start()
+
+    def _load(self):
+        with self._lock:
+            self._load_locked()
+        self._compact_if_needed()
+
+    def _load_locked(self):
+        if self._loaded:
+            return
+        try:
+            with open(self._path, "r") as f:
+                for line in f:
+                    try:
+                        timestamp, weight, key = line.rstrip("\n").split("\t", 2)
+                        self._add(key, float(weight), float(timestamp))
+                    except ValueError:
+                        continue
+                    self._lines += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            warning(f"Failed to read launch log: {str(e)}")
+        self._loaded = True
+        self.version += 1
+
+    def _add(self, key: str, weight: float, timestamp: float):
+        score, last_timestamp = self._scores.get(key, (0.0, timestamp))
+        if timestamp >= last_timestamp:
+            self._scores[key] = (score * self._decay(timestamp - last_timestamp) + weight, timestamp)
+        else:
+            self._scores[key] = (score + weight * self._decay(last_timestamp - timestamp), last_timestamp)
+
+    def _decay(self, elapsed: float) -> float:
+        return 0.5 ** (elapsed / self.HALF_LIFE)
+
+    # Returns the current score of each launched key.
+    def scores(self) -> Dict[str, float]:
+        now = time.time()
+        return {key: score * self._decay(now - timestamp) for key, (score, timestamp) in list(self._scores.items())}
+
+    def record(self, key: str):
+        if "\n" in key:
+            return
+        now = time.time()
+        with self._lock:
+            # The log must be loaded before appending to it, to not count the new launch twice
+            self._load_locked()
+            self._add(key, 1.0, now)
+            self.version += 1
+            try:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self._path, "a") as f:
+                    f.write(f"{now}\t1\t{key}\n")
+                self._lines += 1
+            except OSError as e:
+                warning(f"Failed to write launch log: {str(e)}")
+        self._compact_if_needed()
+
+    def _compact_if_needed(self):
+        with self._lock:
+            if self._compacting or self._lines <= max(self.COMPACT_MIN_LINES, 2 * len(self._scores)):
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact, name="vscode-frecency-compact", daemon=True).start()
+
+    def _compact(self):
+        try:
+            with self._lock:
+                self._scores = {
+                    key: (score, timestamp) for key, (score, timestamp) in self._scores.items()
+                    if score * self._decay(time.time() - timestamp) >= self.MIN_SCORE
+                }
+                tmp_path = self._path.with_suffix(".tmp")
+                with open(tmp_path, "w") as f:
+                    for key, (score, timestamp) in self._scores.items():
+                        f.write(f"{timestamp}\t{score}\t{key}\n")
+                os.replace(tmp_path, self._path)
+                self._lines = len(self._scores)
+        except OSError as e:
+            warning(f"Failed to compact launch log: {str(e)}")
+        finally:
+            self._compacting = False
+
+
+# Runs `check` on paths in background, in a bounded pool of daemon threads. Each path is checked
+# once at a time. A worker whose check lasts more than `deadline` (e.g. hanging on a stale network
+# mount) is counted as stuck and replaced, so a few hanging paths can't block the checks of the others.
+# A stuck worker exits when its check returns, there is at most one per hanging path.
+class BackgroundChecker:
+    def __init__(self, name: str, check: Callable[[str], None], max_workers: int, deadline: float):
+        self._name = name
+        self._check = check
+        self._max_workers = max_workers
+        self._deadline = deadline
+        # Paths queued or being checked, with the time they were requested
+        self.pending: Dict[str, float] = {}
+        self._queue = queue.SimpleQueue()
+        # Start time of the current check of each busy worker, stuck workers are removed
+        self._busy: Dict[int, float] = {}
+        self._workers = 0
+        self._next_worker = 0
+        self._lock = threading.Lock()
+
+    # Queues the `paths` that aren't pending already, and returns them.
+    def submit(self, paths: Iterable[str]) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            queued = [path for path in dict.fromkeys(paths) if path not in self.pending]
+            for path in queued:
+                self.pending[path] = now
+                self._queue.put(path)
+            for worker, started in list(self._busy.items()):
+                if now - started > self._deadline:
+                    del self._busy[worker]
+                    self._workers -= 1
+            # Threads are daemons, a check hanging forever doesn't prevent albert from exiting
+            for _ in range(min(self._max_workers - self._workers, self._queue.qsize())):
+                self._workers += 1
+                self._next_worker += 1
+                threading.Thread(target=self._work, args=(self._next_worker,), name=self._name, daemon=True).start()
+        return queued
+
+    def _work(self, worker: int):
+        while True:
+            path = self._queue.get()
+            with self._lock:
+                self._busy[worker] = time.monotonic()
+            try:
+                self._check(path)
+            except Exception as e:
+                warning(f"Failed to check {path}: {str(e)}")
+            finally:
+                with self._lock:
+                    self.pending.pop(path, None)
+                    stuck = self._busy.pop(worker, None) is None
+            if stuck:
+                # A replacement worker took its place meanwhile
+                return
+
+
+# Cache of paths existence, checked in background by a few worker threads.
+# Readers get the last known state and never wait for a check, so a path on a hanging
+# network mount can't block them. Paths not checked yet, or whose check is too slow, are unknown.
+class ExistenceCache:
+    AVAILABLE = "available"
+    MISSING = "missing"
+    UNKNOWN = "unknown"
+
+    # Time after which a state is checked again
+    TTL = 30.0
+    # Time after which a check that didn't finish makes the state unknown, and its worker is replaced
+    DEADLINE = 2.0
+    MAX_WORKERS = 4
+
+    def __init__(self):
+        # (state, check time) of each path
+        self._states: Dict[str, Tuple[str, float]] = {}
+        self._checker = BackgroundChecker("vscode-exists", self._update, self.MAX_WORKERS, self.DEADLINE)
+
+    # Returns the state of `path`, and schedules a check if it is outdated.
+    def state(self, path: str) -> str:
+        now = time.monotonic()
+        entry = self._states.get(path)
+        # A pending path is submitted again too, which replaces the workers stuck on other paths
+        if entry is None or now - entry[1] > self.TTL or path in self._checker.pending:
+            self.check([path])
+        requested = self._checker.pending.get(path)
+        if entry is None or (requested is not None and now - requested > self.DEADLINE):
+            return self.UNKNOWN
+        return entry[0]
+
+    # Schedules a check of the `paths` that aren't being checked already.
+    def check(self, paths: Iterable[str]):
+        self._checker.submit(paths)
+
+    def _update(self, path: str):
+        try:
+            state = self.AVAILABLE if os.path.exists(path) else self.MISSING
+        except (OSError, ValueError):
+            state = self.UNKNOWN
+        self._states[path] = (state, time.monotonic())
+
+
+# Git status of a repository, `committed_at` is the time of the last commit.
+class GitStatus(NamedTuple):
+    branch: str
+    dirty: bool
+    ahead: int
+    behind: int
+    committed_at: Optional[int]
+
+    # Returns the status shown in the project items, e.g. "main, modified, ahead 1, 3 days ago".
+    def describe(self) -> str:
+        parts = [self.branch]
+        if self.dirty:
+            parts.append("modified")
+        if self.ahead:
+            parts.append(f"ahead {self.ahead}")
+        if self.behind:
+            parts.append(f"behind {self.behind}")
+        if self.committed_at is not None:
+            parts.append(format_age(max(0.0, time.time() - self.committed_at)))
+        return ", ".join(parts)
+
+
+# Git status of the projects, read in background by a bounded pool of workers.
+# Queries only get the cached statuses. A repository is checked again when it is shown after
+# CHECK_INTERVAL, but git only runs again if its metadata (HEAD, index, refs) changed since.
+class GitStatusCache:
+    # Time after which the metadata of a shown repository is checked again
+    CHECK_INTERVAL = 10.0
+    # Time after which the status is read again even if the metadata didn't change, e.g. for edited files
+    MAX_AGE = 300.0
+    GIT_TIMEOUT = 5.0
+    # Time after which a check that didn't finish is counted as stuck, its git calls time out before
+    DEADLINE = 2 * GIT_TIMEOUT + 2.0
+    MAX_WORKERS = 4
+
+    def __init__(self, git_executable: Callable[[], str], stats: Optional[Stats] = None):
+        self._git_executable = git_executable
+        self._stats = stats or Stats()
+        # (metadata key, status, read time) of each repository
+        self._statuses: Dict[str, Tuple[tuple, GitStatus, float]] = {}
+        # Time of the last check of each repository
+        self._checked: Dict[str, float] = {}
+        self._checker = BackgroundChecker("vscode-git-status", self._update, self.MAX_WORKERS, self.DEADLINE)
+
+    # Returns the cached status of `path`, or None if it isn't known (yet), and schedules a check if it is due.
+    def status(self, path: str) -> Optional[GitStatus]:
+        checked = self._checked.get(path)
+        # A pending path is submitted again too, which replaces the workers stuck on other repositories
+        if checked is None or time.monotonic() - checked > self.CHECK_INTERVAL or path in self._checker.pending:
+            self.check([path])
+        entry = self._statuses.get(path)
+        return entry[1] if entry is not None else None
+
+    # Schedules a check of the `paths` that aren't being checked already.
+    def check(self, paths: Iterable[str]):
+        now = time.monotonic()
+        for path in self._checker.submit(paths):
+            self._checked[path] = now
+
+    def _update(self, path: str):
+        key = self.metadata_key(path)
+        if key is None:
+            # Not a git repository (anymore)
+            self._statuses.pop(path, None)
+            return
+        entry = self._statuses.get(path)
+        if entry is not None and entry[0] == key and time.monotonic() - entry[2] < self.MAX_AGE:
+            self._stats.count("git status unchanged")
+            return
+        self._stats.count("git status read")
+        with self._stats.timer("git status"):
+            status = self.read_status(path)
+        if status is not None:
+            self._statuses[path] = (key, status, time.monotonic())
+
+    # Returns the git directory of a working tree and the common directory holding the refs,
+    # they differ for linked worktrees. Returns None if `path` isn't a git working tree.
+    @staticmethod
+    def git_dirs(path: str) -> Optional[Tuple[Path, Path]]:
+        git_path = Path(path) / ".git"
+        if git_path.is_dir():
+            return git_path, git_path
+        try:
+            content = git_path.read_text().strip()
+        except OSError:
+            return None
+        if not content.startswith("gitdir:"):
+            return None
+        git_dir = Path(path) / content[len("gitdir:"):].strip()
+        try:
+            common_dir = git_dir / (git_dir / "commondir").read_text().strip()
+        except OSError:
+            common_dir = git_dir
+        return git_dir, common_dir
+
+    # Returns the signatures of the git files changed by checkouts, commits, staging and fetches,
+    # or None if `path` isn't a git working tree.
+    def metadata_key(self, path: str) -> Optional[tuple]:
+        git_dirs = self.git_dirs(path)
+        if git_dirs is None:
+            return None
+        git_dir, common_dir = git_dirs
+        paths = [
+            git_dir / "HEAD", git_dir / "index", common_dir / "packed-refs", common_dir / "FETCH_HEAD",
+            common_dir / "refs" / "heads",
+        ]
+        try:
+            head = (git_dir / "HEAD").read_text().strip()
+        except OSError:
+            return None
+        if head.startswith("ref:"):
+            paths.append(common_dir / head[len("ref:"):].strip())
+        return (head,) + tuple(map(file_signature, paths))
+
+    # Runs git to read the status of `path`, returns None if it fails.
+    def read_status(self, path: str) -> Optional[GitStatus]:
+        git = self._git_executable()
+        try:
+            # Untracked files are ignored, listing them is slow in large repositories. Without optional locks,
+            # git doesn't refresh the index, which would change the metadata key and trigger another read.
+            result = subprocess.run(
+                [git, "--no-optional-locks", "-C", path, "status", "--porcelain=v2", "--branch", "--untracked-files=no"],
+                capture_output=True, text=True, timeout=self.GIT_TIMEOUT
+            )
+            if result.returncode != 0:
+                return None
+            log = subprocess.run(
+                [git, "-C", path, "log", "-1", "--format=%ct"],
+                capture_output=True, text=True, timeout=self.GIT_TIMEOUT
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            warning(f"Failed to run git status in {path}: {str(e)}")
+            return None
+        committed_at = int(log.stdout.strip()) if log.returncode == 0 and log.stdout.strip().isdigit() else None
+        return self.parse_status(result.stdout, committed_at)
+
+    # Parses the output of `git status --porcelain=v2 --branch`.
+    @staticmethod
+    def parse_status(output: str, committed_at: Optional[int] = None) -> GitStatus:
+        branch, oid, dirty, ahead, behind = "", "", False, 0, 0
+        for line in output.splitlines():
+            if line.startswith("# branch.oid "):
+                oid = line[len("# branch.oid "):]
+            elif line.startswith("# branch.head "):
+                branch = line[len("# branch.head "):]
+            elif line.startswith("# branch.ab "):
+                counts = line[len("# branch.ab "):].split()
+                ahead, behind = abs(int(counts[0])), abs(int(counts[1]))
+            elif line and not line.startswith("#"):
+                dirty = True
+        if branch == "(detached)":
+            branch = oid[:7]
+        return GitStatus(branch, dirty, ahead, behind, committed_at)
+
+
+# Frecency of the items of an index: the launched ones first in the empty query view,
+# and a score bonus for the filtered results.
+class FrecencyRanks(NamedTuple):
+    project_order: List[int]
+    recent_order: List[int]
+    project_bonus: Dict[int, float]
+    recent_bonus: Dict[int, float]
+
+
+# Read-only access to the editor state database, through a connection reused between reads.
+class StateDatabase:
+    def __init__(self):
+        self._path = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self, path: Path) -> sqlite3.Connection:
+        if self._connection is None or self._path != path:
+            self._close()
+            # Read-only, the editor owns the database
+            self._connection = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True, timeout=1.0, check_same_thread=False)
+            self._path = path
+        return self._connection
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    # Returns the value of `key` in the database at `path`, or None if it isn't set.
+    def read(self, path: Path, key: str) -> Optional[str]:
+        with self._lock:
+            try:
+                row = self._connect(path).execute("SELECT value FROM ItemTable WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                # Reconnect on the next read, the database may have been replaced
+                self._close()
+                raise
+        if row is None:
+            return None
+        value = row[0]
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+# Reader of some top-level keys of a large JSON file (storage.json). The file is memory-mapped and only the
+# values of the keys are decoded and parsed, the file is fully parsed only if they can't be located.
+# The values are read again only when the file changes.
+class StorageReader:
+    # Size of the part of the file decoded after a key, it grows until it contains the whole value
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._signature = None
+        self._keys = None
+        self._values: Dict[str, Any] = {}
+
+    # Returns the values of the `keys` present in the file at `path`.
+    def read(self, path: Path, keys: Tuple[str, ...]) -> Dict[str, Any]:
+        signature = file_signature(path)
+        if signature is not None and signature == self._signature and keys == self._keys:
+            return self._values
+
+        with open(path, "rb") as f:
+            values = None
+            if signature is not None and signature[1] > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    values = self.extract(data, keys)
+            if values is None:
+                f.seek(0)
+                storage = json.load(f)
+                values = {key: storage[key] for key in keys if key in storage}
+        self._signature, self._keys, self._values = signature, keys, values
+        return values
+
+    # Returns the values of the `keys` found in `data`, or None if one of them can't be parsed.
+    # Keys are found as `"key":`, the editor writes them without escapes. A key found more than once
+    # may be nested in another value, None is returned then too so the whole file is parsed.
+    def extract(self, data: mmap.mmap, keys: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        values = {}
+        for key in keys:
+            pattern = json.dumps(key).encode()
+            position = self._find_key(data, pattern, 0)
+            if position < 0:
+                continue
+            if self._find_key(data, pattern, position + 1) >= 0:
+                return None
+            start = position + len(pattern)
+            while start < len(data) and data[start] in b" \t\r\n":
+                start += 1
+            if start >= len(data) or data[start] != ord(":"):
+                return None
+            try:
+                values[key] = self._parse_value(data, start + 1)
+            except ValueError:
+                return None
+        return values
+
+    # Returns the position of the first occurrence of the quoted key `pattern` from `start`, or -1.
+    # Occurrences inside strings are skipped, their quotes are escaped.
+    @staticmethod
+    def _find_key(data: mmap.mmap, pattern: bytes, start: int) -> int:
+        position = data.find(pattern, start)
+        while position > 0 and data[position - 1] == ord("\\"):
+            position = data.find(pattern, position + 1)
+        return position
+
+    # Parses the JSON value starting at `start`, decoding larger parts of `data` until it contains the whole value.
+    def _parse_value(self, data: mmap.mmap, start: int) -> Any:
+        decoder = json.JSONDecoder()
+        size = self.CHUNK_SIZE
+        while True:
+            # A character cut at the end of the part is dropped, the value is incomplete then anyway
+            text = data[start:start + size].decode("utf-8", errors="ignore").lstrip()
+            try:
+                return decoder.raw_decode(text)[0]
+            except ValueError:
+                if start + size >= len(data):
+                    raise
+                size *= 4
+
+
+# Reader of the names of the folders of the .code-workspace files.
+# Files are parsed again only when they change, the parsed ones are cached by their signature.
+class WorkspaceReader:
+    def __init__(self):
+        # {workspace path: (file signature, folder names)}
+        self._cache: Dict[str, Tuple[Optional[Tuple[int, int]], List[str]]] = {}
+
+    # Returns the folder names of the local `workspaces` that have some, and forgets the other workspaces.
+    def folders(self, workspaces: Iterable[str]) -> Dict[str, List[str]]:
+        cache, folders = {}, {}
+        for workspace in workspaces:
+            if '://' in workspace or not workspace.endswith(".code-workspace"):
+                continue
+            signature = file_signature(Path(workspace))
+            cached = self._cache.get(workspace)
+            if cached is not None and cached[0] == signature:
+                names = cached[1]
+            else:
+                names = self.read_folders(Path(workspace)) if signature is not None else []
+            cache[workspace] = (signature, names)
+            if names:
+                folders[workspace] = names
+        self._cache = cache
+        return folders
+
+    # Returns the names of the folders of a workspace file: their basenames and the names given to them.
+    @staticmethod
+    def read_folders(path: Path) -> List[str]:
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                workspace = json.loads(strip_jsonc(f.read()))
+        except (OSError, ValueError) as e:
+            warning(f"Failed to read workspace {path}: {str(e)}")
+            return []
+        if not isinstance(workspace, dict) or not isinstance(workspace.get("folders"), list):
+            return []
+
+        names = []
+        for folder in workspace["folders"]:
+            if not isinstance(folder, dict):
+                continue
+            if isinstance(folder.get("path"), str):
+                # Relative paths are relative to the workspace file
+                folder_path = os.path.normpath(os.path.join(path.parent, folder["path"]))
+            elif isinstance(folder.get("uri"), str):
+                folder_path = uri_to_path(folder["uri"]).rstrip("/")
+            else:
+                continue
+            names.append(folder_path.rsplit("/", 1)[-1])
+            if isinstance(folder.get("name"), str):
+                names.append(folder["name"])
+        # Names are searched before the workspace path, they must not change its basename
+        return list(dict.fromkeys(name.replace("/", " ") for name in names if name))
+
+
+# Least recently used cache of the built items. It is cleared when its generation changes,
+# i.e. when the items it contains are outdated.
+class ItemCache:
+    CAPACITY = 1000
+
+    def __init__(self, stats: Optional[Stats] = None):
+        self._items = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+        self._stats = stats or Stats()
+
+    # Returns the item of `key`, built by `factory` if it isn't cached.
+    def get(self, generation: tuple, key: tuple, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if generation != self._generation:
+                self._items.clear()
+                self._generation = generation
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self._stats.count("item cache hit")
+                return item
+
+        self._stats.count("item cache miss")
+        item = factory()
+        with self._lock:
+            if generation == self._generation:
+                self._items[key] = item
+                if len(self._items) > self.CAPACITY:
+                    self._items.popitem(last=False)
+        return item
+
+
+# Finds the git worktrees of repositories, as (path, branch) lists.
+# Worktrees are read from `.git/worktrees` when possible, otherwise `git worktree list` is run by a
+# bounded number of daemon threads. Results are cached per repository until its git metadata changes.
+class WorktreeFinder:
+    MAX_WORKERS = 8
+    # Timeout of a single git call, and of a whole `find` call
+    GIT_TIMEOUT = 5.0
+    DEADLINE = 15.0
+
+    def __init__(self, git_executable: Callable[[], str], stats: Optional[Stats] = None):
+        self._git_executable = git_executable
+        self._cache: Dict[str, Tuple[tuple, Optional[List[Tuple[str, str]]]]] = {}
+        self._stats = stats or Stats()
+
+    # Returns the worktrees of each repository of `repos`, or None for the ones that are not git
+    # repositories or that failed (including the ones that didn't finish before the deadline).
+    def find(self, repos: Iterable[str]) -> Dict[str, Optional[List[Tuple[str, str]]]]:
+        repos = list(dict.fromkeys(repos))
+        results = dict.fromkeys(repos)
+        if not repos:
+            return results
+
+        pending = queue.SimpleQueue()
+        for repo in repos:
+            pending.put(repo)
+        done = queue.SimpleQueue()
+        # Threads are daemons, a lookup hanging on a stale network mount doesn't prevent albert from exiting
+        for _ in range(min(self.MAX_WORKERS, len(repos))):
+            threading.Thread(target=self._work, args=(pending, done), name="vscode-worktrees", daemon=True).start()
+
+        # Don't wait for hanging calls, their repositories keep no worktrees
+        deadline = time.monotonic() + self.DEADLINE
+        remaining = set(repos)
+        while remaining:
+            try:
+                repo, worktrees, error = done.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            remaining.discard(repo)
+            if error is not None:
+                warning(f"Error processing git worktrees for {repo}: {str(error)}")
+            else:
+                results[repo] = worktrees
+        # Repositories not started yet are dropped, the workers stop once the queue is empty
+        while True:
+            try:
+                pending.get_nowait()
+            except queue.Empty:
+                break
+        for repo in remaining:
+            warning(f"Timeout processing git worktrees for {repo}")
+        return results
+
+    # Looks up the worktrees of the repositories of `pending` until it is empty, and puts
+    # the (repository, worktrees, error) results in `done`.
+    def _work(self, pending: queue.SimpleQueue, done: queue.SimpleQueue):
+        while True:
+            try:
+                repo = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                done.put((repo, self._find(repo), None))
+            except Exception as e:
+                done.put((repo, None, e))
+
+    def _find(self, repo: str) -> Optional[List[Tuple[str, str]]]:
+        git_path = Path(repo) / ".git"
+        key = self._cache_key(git_path)
+        cached = self._cache.get(repo)
+        if cached is not None and cached[0] == key:
+            self._stats.count("worktrees cache hit")
+            return cached[1]
+        self._stats.count("worktrees cache miss")
+
+        if git_path.is_dir():
+            worktrees = self._read_worktrees(Path(repo), git_path)
+        elif git_path.exists():
+            # Linked worktree or submodule, let git resolve where the repository is
+            worktrees = self._list_worktrees(repo)
+        else:
+            worktrees = None
+        self._cache[repo] = (key, worktrees)
+        return worktrees
+
+    # Returns True if the worktrees of a repository found before changed since, e.g. with `git worktree add`.
+    def changed(self) -> bool:
+        return any(self._cache_key(Path(repo) / ".git") != key for repo, (key, _) in list(self._cache.items()))
+
+    # Returns the modification times of the git files describing the worktrees.
+    @staticmethod
+    def _cache_key(git_path: Path) -> tuple:
+        paths = [git_path, git_path / "HEAD", git_path / "worktrees"]
+        try:
+            paths += sorted(entry / "HEAD" for entry in (git_path / "worktrees").iterdir())
+        except OSError:
+            pass
+        return tuple(signature and signature[0] for signature in map(file_signature, paths))
+
+    # Reads the worktrees from the repository metadata, without running git.
+    def _read_worktrees(self, repo: Path, git_dir: Path) -> List[Tuple[str, str]]:
+        worktrees = [(str(repo), self._read_head(git_dir / "HEAD"))]
+        try:
+            entries = sorted((git_dir / "worktrees").iterdir())
+        except FileNotFoundError:
+            return worktrees
+
+        for entry in entries:
+            try:
+                # `gitdir` contains the path of the `.git` file in the worktree
+                gitdir = Path((entry / "gitdir").read_text().strip())
+            except OSError:
+                continue
+            if not gitdir.is_absolute():
+                gitdir = entry / gitdir
+            worktrees.append((os.path.normpath(gitdir.parent), self._read_head(entry / "HEAD")))
+        return worktrees
+
+    # Returns the branch checked out by a HEAD file, or the short commit hash for a detached HEAD.
+    @staticmethod
+    def _read_head(head_path: Path) -> str:
+        try:
+            head = head_path.read_text().strip()
+        except OSError:
+            return ""
+        if head.startswith("ref:"):
+            return head[4:].strip().removeprefix("refs/heads/")
+        return head[:7]
+
+    def _list_worktrees(self, repo: str) -> Optional[List[Tuple[str, str]]]:
+        try:
+            output = subprocess.run(
+                [self._git_executable(), "-C", repo, "worktree", "list", "--porcelain"],
+                capture_output=True, text=True, timeout=self.GIT_TIMEOUT, check=True
+            ).stdout
+        except (subprocess.SubprocessError, OSError) as e:
+            warning(f"Error processing git worktrees for {repo}: {str(e)}")
+            return None
+        return self.parse_porcelain(output)
+
+    # Parses the output of `git worktree list --porcelain`, bare repositories are skipped.
+    @staticmethod
+    def parse_porcelain(output: str) -> List[Tuple[str, str]]:
+        worktrees = []
+        for record in output.split("\n\n"):
+            attributes = {}
+            for line in record.splitlines():
+                name, _, value = line.partition(" ")
+                attributes[name] = value
+            if "worktree" not in attributes or "bare" in attributes:
+                continue
+            if "branch" in attributes:
+                branch = attributes["branch"].removeprefix("refs/heads/")
+            else:
+                branch = attributes.get("HEAD", "")[:7]
+            worktrees.append((attributes["worktree"], branch))
+        return worktrees
+
+
+# Search over a list of lowercase keys, using trigram postings lists.
+# A term matches a key if it is a substring of it, or in fuzzy mode a subsequence of it.
+# Keys can also have tags, a term equal to one of the tags of a key matches it.
+class TrigramIndex:
+    # Characters after which a match starts a new word
+    WORD_SEPARATORS = frozenset("/\\-_. :")
+
+    def __init__(self, keys: List[str], tags: Optional[List[AbstractSet[str]]] = None):
+        self.keys = keys
+        self.tags = tags
+        # Offset of the basename in each key, basename matches are ranked first
+        self.basename_offsets = [key.rfind("/") + 1 for key in keys]
+        # Basenames one per line, subsequence matches are found by a single regex scan of them
+        self._basenames = "\n".join(key[offset:] for key, offset in zip(keys, self.basename_offsets))
+        self._basename_starts = array("l")
+        start = 0
+        for key, offset in zip(keys, self.basename_offsets):
+            self._basename_starts.append(start)
+            start += len(key) - offset + 1
+        # Ids of the keys containing each trigram, in ascending order
+        self._postings: Dict[str, List[int]] = {}
+        for key_id, key in enumerate(keys):
+            for trigram in {key[i:i + 3] for i in range(len(key) - 2)}:
+                self._postings.setdefault(trigram, []).append(key_id)
+        # Ids of the keys having each tag
+        self._tagged: Dict[str, List[int]] = {}
+        for key_id, key_tags in enumerate(tags or []):
+            for tag in key_tags:
+                self._tagged.setdefault(tag, []).append(key_id)
+
+    # Returns the score of `term` for a key, or None if it doesn't match.
+    # Tag matches score first, then substring matches (in the basename and at word boundaries first),
+    # then subsequence matches in the basename.
+    def term_score(self, key_id: int, term: str, fuzzy: bool = False) -> Optional[float]:
+        if self.tags and term in self.tags[key_id]:
+            return 120.0
+        key = self.keys[key_id]
+        basename_offset = self.basename_offsets[key_id]
+
+        position = key.find(term, basename_offset)
+        if position >= 0:
+            score = 100.0
+            if position == basename_offset:
+                score += 50.0 if len(key) - basename_offset == len(term) else 30.0
+        else:
+            position = key.find(term)
+            if position < 0:
+                return self._fuzzy_score(key, term, basename_offset) if fuzzy else None
+            score = 60.0
+        if position == 0 or key[position - 1] in self.WORD_SEPARATORS:
+            score += 15.0
+        return score
+
+    # Returns the score, between 10 and 50, of `term` as a subsequence of the basename of `key`
+    # starting at a word start, or None if it isn't one. Scattered matches like "fil" in "config-all"
+    # don't start at a word. Unlike a minimal score, this holds for all the prefixes of a matching term,
+    # so narrowing the fuzzy matches of the previous query finds the same matches as a full search.
+    def _fuzzy_score(self, key: str, term: str, basename_offset: int) -> Optional[float]:
+        # Starting at the first word starting with the first character keeps the most characters to match the rest
+        position = basename_offset - 1
+        while True:
+            position = key.find(term[0], position + 1)
+            if position < 0:
+                return None
+            if position == basename_offset or key[position - 1] in self.WORD_SEPARATORS:
+                break
+        points = 8
+        for char in term[1:]:
+            found = key.find(char, position + 1)
+            if found < 0:
+                return None
+            if found == position + 1:
+                points += 3
+            if key[found - 1] in self.WORD_SEPARATORS:
+                points += 5
+            position = found
+        return 10.0 + 40.0 * points / (8 * len(term))
+
+    def score(self, key_id: int, terms: Iterable[str], fuzzy: bool = False) -> Optional[float]:
+        total = 0.0
+        for term in terms:
+            score = self.term_score(key_id, term, fuzzy)
+            if score is None:
+                return None
+            total += score
+        return total
+
+    # Returns the ids of `candidates` matching all the `terms`. Substring matches are filtered one term
+    # at a time, so a query matching most of the keys doesn't cost a method call per key.
+    def filter(self, candidates: Iterable[int], terms: Sequence[str], fuzzy: bool = False) -> List[int]:
+        if fuzzy:
+            return [key_id for key_id in candidates if self.score(key_id, terms, fuzzy) is not None]
+        keys, tags = self.keys, self.tags
+        candidates = list(candidates)
+        for term in terms:
+            if tags:
+                candidates = [key_id for key_id in candidates if term in keys[key_id] or term in tags[key_id]]
+            else:
+                candidates = [key_id for key_id in candidates if term in keys[key_id]]
+        return candidates
+
+    # Returns the ids of the keys that can contain `term`, or None if the index can't narrow it down.
+    def _candidates(self, term: str) -> Optional[List[int]]:
+        if len(term) < 3:
+            return None
+        # The rarest trigram of the term gives the smallest superset of its matches
+        candidates = min(
+            (self._postings.get(term[i:i + 3], []) for i in range(len(term) - 2)), key=len
+        )
+        tagged = self._tagged.get(term)
+        if tagged:
+            candidates = sorted(set(candidates).union(tagged))
+        return candidates
+
+    # Returns the ids of the keys that can match `term` fuzzily: the ones having it as a tag or substring,
+    # or whose basename contains its characters in order from a word start.
+    def _fuzzy_candidates(self, term: str) -> AbstractSet[int]:
+        # Each next character is found after the shortest run of other characters, so the regex never
+        # backtracks over the basename. Word starts are checked by the scoring, a lookbehind is much slower.
+        pattern = re.escape(term[0]) + "".join(f"[^\n{re.escape(char)}]*{re.escape(char)}" for char in term[1:])
+        starts = self._basename_starts
+        candidates = {bisect_right(starts, match.start()) - 1 for match in re.finditer(pattern, self._basenames)}
+        candidates.update(self.search([term]))
+        return candidates
+
+    # Returns the ids, in ascending order, of the keys matching all the `terms`.
+    # `within` restricts the search to a subset of the ids.
+    def search(self, terms: Sequence[str], within: Optional[AbstractSet[int]] = None, fuzzy: bool = False) -> List[int]:
+        candidates = None
+        if fuzzy:
+            for term in terms:
+                term_candidates = self._fuzzy_candidates(term)
+                candidates = term_candidates if candidates is None else candidates & term_candidates
+            if candidates is not None:
+                candidates = sorted(candidates)
+        # Intersect the postings lists by checking the candidates of the most selective term against all terms
+        for term in terms if not fuzzy else ():
+            term_candidates = self._candidates(term)
+            if term_candidates is not None and (candidates is None or len(term_candidates) < len(candidates)):
+                candidates = term_candidates
+
+        if candidates is None:
+            candidates = sorted(within) if within is not None else range(len(self.keys))
+        elif within is not None:
+            if len(within) < len(candidates):
+                candidates = sorted(within)
+            else:
+                candidates = [key_id for key_id in candidates if key_id in within]
+        return self.filter(candidates, terms, fuzzy)
+
+    # Returns the ids matching `terms` among `previous`, the ids matching a query that `terms` extends.
+    def narrow(self, previous: List[int], terms: Sequence[str], fuzzy: bool = False) -> List[int]:
+        # A key can match an extended term by one of its tags only, without matching the shorter term
+        tagged = [self._tagged[term] for term in terms if term in self._tagged]
+        candidates = sorted(set(previous).union(*tagged)) if tagged else previous
+        return self.filter(candidates, terms, fuzzy)
+
+    # Yields `ids` from the best ranked for `terms`, ties are kept in ids order.
+    # `bonus` is added to the score of the ids it contains. The ids are scored and heapified at once,
+    # then each next id costs O(log n), so a consumer that stops early never sorts the whole list.
+    def ranked(self, ids: Iterable[int], terms: Sequence[str], fuzzy: bool = False,
+               bonus: Optional[Dict[int, float]] = None) -> Iterator[int]:
+        bonus = bonus or {}
+        heap = [(-(self.score(key_id, terms, fuzzy) or 0.0) - bonus.get(key_id, 0.0), key_id) for key_id in ids]
+        heapq.heapify(heap)
+        while heap:
+            yield heapq.heappop(heap)[1]
+
+
+# Ids of the keys matching a query, `fuzzy` tells if subsequence matches are included.
+class Matches(NamedTuple):
+    ids: List[int]
+    fuzzy: bool
+
+
+# A project or recent item of an index. Paths are split in their directory, interned so the items
+# of a directory share it, and their basename. The display strings are derived when an item is built.
+# Entries are classified as local or remote once, remote ones are never accessed on the filesystem.
+class Entry:
+    __slots__ = ("kind", "name", "directory", "basename", "tags", "subtext", "editor", "remote")
+
+    PROJECT = "Project"
+    FILE = "File"
+    FOLDER = "Folder"
+
+    # `name` is the project name, or the label given by the editor to a recent item.
+    # `editor` is the name of the editor the item is opened in, None for the editor of the current mode.
+    def __init__(self, kind: str, path: str, name: Optional[str] = None, tags: AbstractSet[str] = frozenset(),
+                 editor: Optional[str] = None):
+        self.kind = kind
+        directory, separator, self.basename = path.rpartition("/")
+        self.directory = sys.intern(directory) if separator else None
+        self.name = name
+        self.tags = tags
+        # Shortened path shown in the item subtext, set by the index
+        self.subtext = ""
+        self.editor = editor
+        # Remote shown in the item, e.g. "SSH: host", None for local entries
+        self.remote = uri_remote(path)
+
+    @property
+    def path(self) -> str:
+        return self.basename if self.directory is None else f"{self.directory}/{self.basename}"
+
+    # Returns the local path of the entry, or None if it is remote.
+    @property
+    def local_path(self) -> Optional[str]:
+        if self.remote is not None:
+            return None
+        path = self.path
+        return uri_to_path(path) if path.startswith("file:") else path
+
+    # Returns the path shown in the subtext of remote entries, with their remote.
+    @property
+    def remote_subtext(self) -> str:
+        return f"{unquote(urlsplit(self.path).path) or '/'} [{self.remote}]"
+
+    # Returns the words of the remote, searched as tags, e.g. {"ssh", "host"}.
+    @property
+    def remote_tokens(self) -> AbstractSet[str]:
+        if self.remote is None:
+            return frozenset()
+        return frozenset(token for token in re.split(r"[\s:]+", self.remote.lower()) if token)
+
+    # Projects root paths may be URIs already, recent items are local paths or URIs.
+    @property
+    def uri(self) -> str:
+        return project_uri(self.path) if self.kind == self.PROJECT else path_to_uri(self.path)
+
+    @property
+    def title(self) -> str:
+        if self.kind == self.PROJECT:
+            return self.name or ""
+        return f"{self.kind}: {self.name or self.basename}"
+
+
+# Searchable index of the projects and recent items, rebuilt when they are reloaded.
+class Index:
+    # `display_path` returns the shortened path shown in the items subtext.
+    # `editors` maps the projects and recent items paths to the name of the editor they are opened in,
+    # the items not in it are opened in the editor of the current mode.
+    # `workspace_folders` are the folder names of the workspaces, a workspace also matches them.
+    def __init__(self, projects: List[dict], files: List[str], folders: List[str], workspaces: List[str],
+                 labels: Optional[Dict[str, str]] = None, display_path: Callable[[str], str] = str,
+                 editors: Optional[Dict[str, str]] = None, workspace_folders: Optional[Dict[str, List[str]]] = None):
+        editors = editors or {}
+
+        # Projects with the same tags share them
+        tag_sets = {}
+        self.projects: List[Entry] = []
+        for project in projects:
+            if not project.get('enabled', True) or not project.get('rootPath'):
+                continue
+            name = project.get('name', '')
+            entry = Entry(Entry.PROJECT, project['rootPath'], name, editor=editors.get(project['rootPath']))
+            # Projects without name only match an empty query
+            if name:
+                tags = frozenset(sys.intern(tag.lower()) for tag in project.get('tags', [])) | entry.remote_tokens
+                entry.tags = tag_sets.setdefault(tags, tags)
+            self.projects.append(entry)
+        self.project_search = TrigramIndex(
+            [project.name.lower() for project in self.projects], [project.tags for project in self.projects]
+        )
+        for project in self.projects:
+            project.subtext = display_path(project.local_path) if project.remote is None else project.remote_subtext
+
+        recent_paths = [path for path in dict.fromkeys(files + folders + workspaces) if path]
+        file_paths = set(files)
+        labels = labels or {}
+        self.recents: List[Entry] = [
+            Entry(Entry.FILE if path in file_paths else Entry.FOLDER, path, labels.get(path), editor=editors.get(path))
+            for path in recent_paths
+        ]
+        for recent, path in zip(self.recents, recent_paths):
+            recent.subtext = display_path(path) if recent.remote is None else recent.remote_subtext
+
+        # Folder names are put before the workspace path, so the workspace basename is still ranked first
+        workspace_folders = workspace_folders or {}
+        # Remote items also match the words of their remote, e.g. the host
+        recent_tags = [recent.remote_tokens for recent in self.recents]
+        self.recent_search = TrigramIndex([
+            " ".join(workspace_folders[path] + [path]).lower() if path in workspace_folders else path.lower()
+            for path in recent_paths
+        ], recent_tags if any(recent_tags) else None)
+        self.file_ids = frozenset(i for i, recent in enumerate(self.recents) if recent.kind == Entry.FILE)
+        folder_paths = set(folders + workspaces)
+        self.folder_ids = frozenset(i for i, path in enumerate(recent_paths) if path in folder_paths)
+
+    # Returns the frecency ranks of the items, from the scores of their URIs.
+    def frecency_ranks(self, scores: Dict[str, float]) -> FrecencyRanks:
+        project_scores = {}
+        for i, project in enumerate(self.projects):
+            score = scores.get(project.uri)
+            if score is not None:
+                project_scores[i] = score
+        recent_scores = {}
+        for i, recent in enumerate(self.recents):
+            score = scores.get(project_uri(recent.path))
+            if score is not None:
+                recent_scores[i] = score
+        return FrecencyRanks(
+            self._frecency_order(project_scores, len(self.projects)),
+            self._frecency_order(recent_scores, len(self.recents)),
+            {i: self.frecency_bonus(score) for i, score in project_scores.items()},
+            {i: self.frecency_bonus(score) for i, score in recent_scores.items()},
+        )
+
+    # Returns the ids sorted by decreasing score, the ids without score keep their order after them.
+    @staticmethod
+    def _frecency_order(scores: Dict[int, float], count: int) -> List[int]:
+        order = sorted(scores, key=lambda i: (-scores[i], i))
+        return order + [i for i in range(count) if i not in scores]
+
+    # Returns the match score bonus for a frecency score, it only reorders matches of similar quality.
+    @staticmethod
+    def frecency_bonus(score: float) -> float:
+        return min(40.0, 10.0 * math.log2(1.0 + score))
+
+
+# Files of a project root, as paths relative to it. Each file is stored as the id of its directory
+# and its interned name, the lowercase paths are searched in a single newline separated string.
+class FileList:
+    # `directories` are the listed directories of a walk, {relative path: (mtime, files, subdirectories)}
+    def __init__(self, files: Iterable[Tuple[str, str]], directories: Optional[Dict[str, tuple]] = None):
+        self.directories = directories
+        self.built_at = time.monotonic()
+        self.dirs: List[str] = []
+        self.file_dirs = array("I")
+        self.file_names: List[str] = []
+        dir_ids: Dict[str, int] = {}
+        for directory, name in files:
+            dir_id = dir_ids.get(directory)
+            if dir_id is None:
+                dir_id = dir_ids[directory] = len(self.dirs)
+                self.dirs.append(sys.intern(directory))
+            self.file_dirs.append(dir_id)
+            self.file_names.append(sys.intern(name))
+
+        # Offsets are computed on the lowercase paths, lowering may change the length of some characters
+        lowercase_paths = [self.path(file_id).lower() for file_id in range(len(self.file_names))]
+        self._starts = array("L")
+        offset = 0
+        for path in lowercase_paths:
+            self._starts.append(offset)
+            offset += len(path) + 1
+        self._text = "\n".join(lowercase_paths)
+
+    def __len__(self) -> int:
+        return len(self.file_names)
+
+    # Returns the approximate memory used by the list, in bytes.
+    @property
+    def size(self) -> int:
+        size = len(self._text) + 16 * len(self.file_names) + sum(map(len, self.dirs)) + 64 * len(self.dirs)
+        if self.directories is not None:
+            size += 8 * len(self.file_names) + 128 * len(self.directories)
+        return size
+
+    def path(self, file_id: int) -> str:
+        directory = self.dirs[self.file_dirs[file_id]]
+        name = self.file_names[file_id]
+        return f"{directory}/{name}" if directory else name
+
+    # Returns the ids of the files whose path contains all the `terms`, in the list order.
+    def search(self, terms: Sequence[str]) -> List[int]:
+        if not terms:
+            return list(range(len(self.file_names)))
+        text, starts = self._text, self._starts
+        # Find the occurrences of the longest term, the other terms are checked in the paths containing them
+        longest = max(terms, key=len)
+        matches = []
+        position = text.find(longest)
+        while position >= 0:
+            file_id = bisect_right(starts, position) - 1
+            end = starts[file_id + 1] - 1 if file_id + 1 < len(starts) else len(text)
+            path = text[starts[file_id]:end]
+            if all(term in path for term in terms):
+                matches.append(file_id)
+            position = text.find(longest, end + 1)
+        return matches
+
+    # Yields `ids` from the best ranked for `terms`: the files whose name matches more terms first,
+    # then the shortest paths. Like `TrigramIndex.ranked`, the ids are heapified and popped lazily.
+    def ranked(self, ids: Iterable[int], terms: Sequence[str]) -> Iterator[int]:
+        starts, text_length = self._starts, len(self._text)
+        heap = []
+        for file_id in ids:
+            name = self.file_names[file_id].lower()
+            end = starts[file_id + 1] - 1 if file_id + 1 < len(starts) else text_length
+            heap.append((-sum(term in name for term in terms), end - starts[file_id], file_id))
+        heapq.heapify(heap)
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+
+# Indexes the files of project roots in background, to search them with `vs project/ fragment`.
+# Git repositories are listed with `git ls-files`, other roots are walked, listing again only the
+# directories whose mtime changed. The least recently used lists are evicted above the memory limit.
+class FileIndexer:
+    # Time after which a list is updated in background when it is used
+    REFRESH_INTERVAL = 30.0
+    GIT_TIMEOUT = 30.0
+    # Maximal number of files of a walked root
+    MAX_FILES = 200000
+    # Approximate memory used by all the lists, in bytes
+    MEMORY_LIMIT = 64 * 1024 * 1024
+    # Directories skipped by walks, as well as the hidden ones
+    PRUNED_DIRECTORIES = frozenset({
+        "node_modules", "__pycache__", "venv", "build", "dist", "target", "out", "vendor", "bower_components",
+    })
+
+    def __init__(self, git_executable: Callable[[], str], stats: Optional[Stats] = None):
+        self._git_executable = git_executable
+        self._stats = stats or Stats()
+        # Lists of the roots, least recently used first
+        self._lists: OrderedDict[str, FileList] = OrderedDict()
+        self._building = set()
+        self._lock = threading.Lock()
+
+    # Returns the files of `root`, or None if they are not indexed yet. Missing and outdated lists are
+    # built in background, the outdated one is returned meanwhile.
+    def get(self, root: str) -> Optional[FileList]:
+        with self._lock:
+            file_list = self._lists.get(root)
+            if file_list is not None:
+                self._lists.move_to_end(root)
+            if (file_list is None or time.monotonic() - file_list.built_at > self.REFRESH_INTERVAL) \
+                    and root not in self._building:
+                self._building.add(root)
+                threading.Thread(target=self._build, args=(root, file_list), name="vscode-files", daemon=True).start()
+        return file_list
+
+    def _build(self, root: str, previous: Optional[FileList]):
+        try:
+            with self._stats.timer("file index build"):
+                file_list = None
+                if (Path(root) / ".git").exists():
+                    file_list = self._list_git(root)
+                if file_list is None:
+                    file_list = self._walk(root, previous)
+            with self._lock:
+                self._lists[root] = file_list
+                self._lists.move_to_end(root)
+                # Evict whole lists, always keeping the one just built
+                total = sum(file_list.size for file_list in self._lists.values())
+                while total > self.MEMORY_LIMIT and len(self._lists) > 1:
+                    _, evicted = self._lists.popitem(last=False)
+                    total -= evicted.size
+                    self._stats.count("file index evicted")
+        except Exception as e:
+            warning(f"Failed to index the files of {root}: {str(e)}")
+        finally:
+            with self._lock:
+                self._building.discard(root)
+
+    # Returns the tracked and untracked, not ignored, files of a git repository, or None if git fails.
+    def _list_git(self, root: str) -> Optional[FileList]:
+        try:
+            result = subprocess.run(
+                [self._git_executable(), "-C", root, "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+                capture_output=True, timeout=self.GIT_TIMEOUT
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            warning(f"Failed to list the files of {root}: {str(e)}")
+            return None
+        if result.returncode != 0:
+            return None
+        paths = dict.fromkeys(result.stdout.decode("utf-8", "replace").split("\0"))
+        return FileList(path.rpartition("/")[::2] for path in paths if path)
+
+    # Walks `root`, reusing the listings of the `previous` walk for the directories that didn't change.
+    def _walk(self, root: str, previous: Optional[FileList]) -> FileList:
+        previous_directories = previous.directories if previous is not None and previous.directories else {}
+        directories = {}
+        stack = [""]
+        count = 0
+        while stack and count < self.MAX_FILES:
+            directory = stack.pop()
+            path = os.path.join(root, directory)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            listing = previous_directories.get(directory)
+            if listing is None or listing[0] != mtime:
+                files, subdirectories = [], []
+                try:
+                    with os.scandir(path) as entries:
+                        for entry in entries:
+                            if not entry.is_dir(follow_symlinks=False):
+                                files.append(sys.intern(entry.name))
+                            elif entry.name not in self.PRUNED_DIRECTORIES and not entry.name.startswith("."):
+                                subdirectories.append(sys.intern(entry.name))
+                except OSError:
+                    continue
+                listing = (mtime, files, subdirectories)
+                self._stats.count("file index directory listed")
+            directories[directory] = listing
+            count += len(listing[1])
+            stack.extend(f"{directory}/{name}" if directory else name for name in reversed(listing[2]))
+
+        return FileList(
+            ((directory, name) for directory, listing in directories.items() for name in listing[1]),
+            directories
+        )
+
+
+# An editor of the EDITORS table, with the index of its projects and recent items.
+# Each editor is loaded and reloaded on its own, changing the mode only switches the editor queried.
+class Editor:
+    def __init__(self, name: str, config: dict):
+        self.name = name
+        icons_dir = Path(__file__).parent / "icons"
+        self.icon = icons_dir / f"{config['icon_prefix']}.png"
+        self.icon_project = icons_dir / f"{config['icon_prefix']}_project.png"
+
+        self.config_dir = Path.home() / ".config" / config["config_dir"]
+        config_base = self.config_dir / "User" / "globalStorage"
+        self.recent_path = config_base / "storage.json"
+        self.state_path = config_base / "state.vscdb"
+        self.projects_path = config_base / "alefragnani.project-manager" / "projects.json"
+
+        self.executables = config["executable"] if isinstance(config["executable"], list) else [config["executable"]]
+        self.executable = ""
+        self.installed = False
+        self.find_executable()
+
+        # Sources of the index, created by the plugin when the editor starts loading
+        self.recent: Optional[CachedSource] = None
+        self.projects: Optional[CachedSource] = None
+        self.state_database = StateDatabase()
+        self.workspaces = WorkspaceReader()
+        self.storage = StorageReader()
+        # Raw history or storage.json values the recent items were last parsed from
+        self.recent_raw: Any = None
+        # Shortened paths shown in the items subtext, precomputed at load time
+        self.display_paths: Dict[str, str] = {}
+        self.index = Index([], [], [], [])
+        self.lock = threading.Lock()
+        # Set when the first load is done
+        self.ready = threading.Event()
+
+    @property
+    def started(self) -> bool:
+        return self.recent is not None
+
+    # Looks for the executable of the editor in PATH again, e.g. after it was installed.
+    def find_executable(self):
+        self.executable = next((exe for exe in map(which, self.executables) if exe), "")
+        # Editors that are not installed may still have their configuration, e.g. AppImages not in PATH
+        self.installed = bool(self.executable) or self.config_dir.exists()
+
 
 class Plugin(PluginInstance, GeneratorQueryHandler):
+    # Version of the index snapshot format, snapshots of other versions are ignored
+    SNAPSHOT_VERSION = 3
+    # Key of the recent items history in the state database
+    RECENT_HISTORY_KEY = "history.recentlyOpenedPathsList"
+    # Keys of storage.json the recent items are read from, when the state database can't be read
+    STORAGE_KEYS = ("lastKnownMenubarData", "profileAssociations")
+    # Number of items of the first batch of results, and of the next ones pulled by albert
+    FIRST_BATCH_SIZE = 20
+    BATCH_SIZE = 100
+    # Fuzzy matches are searched when there are less substring matches than this
+    FUZZY_THRESHOLD = 50
+    # Minimal delay between two checks of the worktrees of the projects
+    WORKTREE_CHECK_INTERVAL = 10.0
+
     ICON_PROJECT = Path(__file__).parent / "icons" / "icon_project.png"
     ICON = Path(__file__).parent / "icons" / "icon.png"
-    VSCODE_PROJECTS_PATH = Path.home() / ".config" / "Code" / "User" / "globalStorage" / 'alefragnani.project-manager' / 'projects.json'
-    VSCODE_RECENT_PATH = Path.home() / ".config" / "Code" / "User" / "globalStorage" / "storage.json"
 
     def __init__(self):
         GeneratorQueryHandler.__init__(self)
         PluginInstance.__init__(self)
 
-        self._mode = self.readConfig("mode", str)
-        if self._mode is None:
-            self._mode = "VSCode"
-        else:
-            self.updateMode()
+        # Statistics of the hot paths, only collected when enabled in the settings
+        self._stats = Stats(self.readConfig("collect_stats", bool) or False)
 
         # Initialize git worktree settings
         self._extract_worktrees = self.readConfig("extract_worktrees", bool) or False
+        self._show_git_status = self.readConfig("show_git_status", bool) or False
         self._git_executable = self.readConfig("git_executable", str) or "git"
         self._worktree_name_template = self.readConfig("worktree_name_template", str) or "{name}:{branch}"
+        self._worktrees = WorktreeFinder(lambda: self._git_executable, self._stats)
+        self._worktrees_checked_at = 0.0
+        self._checking_worktrees = False
+
+        # (index, filters, project ids, recent ids) of the last query, to narrow them while typing
+        self._last_search = None
+
+        # Existence of the local projects paths
+        self._existence = ExistenceCache()
+
+        # Launch log, loaded on the first query
+        self._frecency = FrecencyLog(Path(self.dataLocation()) / "launches.log")
+        # (index, frecency version, ranks) of the last computed frecency ranks
+        self._frecency_ranks = None
+
+        # Items built by the last queries
+        self._item_cache = ItemCache(self._stats)
+
+        # Git status of the local projects, shown in their subtext
+        self._git_status = GitStatusCache(lambda: self._git_executable, self._stats)
+
+        # Files of the projects searched with `vs project/ fragment`
+        self._files = FileIndexer(lambda: self._git_executable, self._stats)
 
-        # Initialize cache (will be populated on first successful use)
-        self._cached_files = []
-        self._cached_folders = []
-        self._cached_workspaces = []
-        self._cached_projects = []
+        # Index of each editor, reloaded in background when its files change
+        self._editors = {name: Editor(name, config) for name, config in EDITORS.items()}
+        # Index merging the ones of all the editors, built in background in the "All editors" mode
+        self._merged_index: Optional[Index] = None
+        self._merge_lock = threading.Lock()
 
-        # Populate cache once on init (non-critical if it fails)
+        # Load the installed editors in background, queries show a placeholder until the current one is loaded
+        self._mode = self.readConfig("mode", str) or "VSCode"
+        for editor in self._editors.values():
+            if editor.installed:
+                self._start_loading(editor)
+        self.updateMode()
+
+    def snapshot_path(self, editor: Editor) -> Path:
+        return Path(self.cacheLocation()) / "index" / f"{editor.config_dir.name}.json"
+
+    # Returns the settings the index depends on, a snapshot made with other settings is outdated.
+    def index_settings(self) -> list:
+        return [self._extract_worktrees, self._git_executable, self._worktree_name_template]
+
+    # Returns the editors that are loaded or loading.
+    def started_editors(self) -> List[Editor]:
+        return [editor for editor in self._editors.values() if editor.started]
+
+    # Starts loading the index of `editor` in background, if it isn't already.
+    def _start_loading(self, editor: Editor):
+        if editor.started:
+            return
+        editor.projects = CachedSource(
+            f"{editor.name} projects", lambda: [editor.projects_path],
+            lambda: self.get_favorite_projects(editor), [], lambda: self._on_source_loaded(editor, True), self._stats
+        )
+        editor.recent = CachedSource(
+            f"{editor.name} recent items", lambda: self.recent_source_paths(editor),
+            lambda: self.get_visual_studio_code_recent(editor), ([], [], [], {}, {}),
+            lambda: self._on_source_loaded(editor), self._stats
+        )
+        threading.Thread(target=self._load_index, args=(editor,), name=f"vscode-startup-{editor.name}", daemon=True).start()
+
+    # Loads the index of an editor: restores the snapshot of the last session if there is one,
+    # then reloads the sources that changed since it was made.
+    def _load_index(self, editor: Editor):
         try:
-            self._cached_files, self._cached_folders, self._cached_workspaces = self.get_visual_studio_code_recent()
-        except Exception as e:
-            warning(f"Failed to load recent items: {str(e)}")
+            restored = self._restore_snapshot(editor)
+            if restored:
+                editor.index = self._build_index(editor)
+                self._check_projects(editor.index)
+                editor.ready.set()
+                editor.recent.refresh()
+                # The worktrees aren't part of the files signature, they may have changed since the snapshot
+                editor.projects.refresh(force=self._extract_worktrees)
+            else:
+                editor.recent.reload()
+                editor.projects.reload()
+        finally:
+            editor.ready.set()
+            self._merge_indexes()
 
+    def _restore_snapshot(self, editor: Editor) -> bool:
         try:
-            self._cached_projects = self.get_favorite_projects()
-        except Exception as e:
-            warning(f"Failed to load projects: {str(e)}")
+            with open(self.snapshot_path(editor), "r") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            warning(f"Failed to read index snapshot: {str(e)}")
+            return False
+
+        if snapshot.get("version") != self.SNAPSHOT_VERSION or snapshot.get("settings") != self.index_settings():
+            return False
+        try:
+            editor.recent.restore(snapshot["recent"])
+            # JSON has no tuples, an unchanged reload must compare equal to the restored value
+            editor.recent.value = tuple(editor.recent.value)
+            editor.projects.restore(snapshot["projects"])
+            editor.display_paths = snapshot["display_paths"]
+        except (KeyError, TypeError, ValueError) as e:
+            warning(f"Invalid index snapshot: {str(e)}")
+            return False
+        return True
+
+    def _save_snapshot(self, editor: Editor):
+        snapshot = {
+            "version": self.SNAPSHOT_VERSION,
+            "settings": self.index_settings(),
+            "recent": editor.recent.snapshot(),
+            "projects": editor.projects.snapshot(),
+            "display_paths": editor.display_paths,
+        }
+        path = self.snapshot_path(editor)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first, so an interrupted write never leaves a broken snapshot
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            warning(f"Failed to write index snapshot: {str(e)}")
+
+    # Called from the loading threads when a source of `editor` has been reloaded,
+    # `projects` tells if it is the projects.
+    def _on_source_loaded(self, editor: Editor, projects: bool = False):
+        with editor.lock:
+            with self._stats.timer("index build"):
+                editor.index = self._build_index(editor)
+            self._check_projects(editor.index, git_status=projects)
+            with self._stats.timer("display paths"):
+                self._update_display_paths(editor)
+            with self._stats.timer("snapshot save"):
+                self._save_snapshot(editor)
+        self._merge_indexes()
+
+    def _build_index(self, editor: Editor) -> Index:
+        files, folders, workspaces, labels, workspace_folders = editor.recent.value
+        display_paths = editor.display_paths
+        return Index(
+            editor.projects.value, files, folders, workspaces, labels,
+            lambda path: self.display_path(display_paths, path), workspace_folders=workspace_folders
+        )
+
+    # Builds the index of the "All editors" mode, once all the loading editors are loaded.
+    # Items found in several editors are kept once, and opened in the first one of EDITORS.
+    def _merge_indexes(self):
+        if self.mode != ALL_EDITORS:
+            return
+        editors = self.started_editors()
+        if not all(editor.ready.is_set() for editor in editors):
+            return
+
+        with self._merge_lock, self._stats.timer("index merge"):
+            projects, files, folders, workspaces, labels, display_paths, item_editors = [], [], [], [], {}, {}, {}
+            workspace_folders = {}
+            for editor in editors:
+                for project in editor.projects.value:
+                    root_path = project.get('rootPath')
+                    if root_path and root_path not in item_editors:
+                        item_editors[root_path] = editor.name
+                        projects.append(project)
+                editor_files, editor_folders, editor_workspaces, editor_labels, editor_workspace_folders = editor.recent.value
+                files += editor_files
+                folders += editor_folders
+                workspaces += editor_workspaces
+                for path in editor_files + editor_folders + editor_workspaces:
+                    item_editors.setdefault(path, editor.name)
+                labels = {**editor_labels, **labels}
+                workspace_folders = {**editor_workspace_folders, **workspace_folders}
+                display_paths.update(editor.display_paths)
+
+            index = Index(
+                projects, files, folders, workspaces, labels,
+                lambda path: self.display_path(display_paths, path), item_editors, workspace_folders
+            )
+            # The git statuses are the ones prefetched for the editors indexes
+            self._check_projects(index, git_status=False)
+            self._merged_index = index
+
+    # Starts checking the existence of the projects paths before they are queried. Their git statuses are
+    # prefetched too if `git_status`, only when the projects are loaded: recent items reloads follow each
+    # write of the editor state, and the statuses of the shown projects are checked again anyway.
+    def _check_projects(self, index: Index, git_status: bool = True):
+        local_paths = list(filter(None, (project.local_path for project in index.projects)))
+        self._existence.check(local_paths)
+        if git_status and self._show_git_status:
+            self._git_status.check(local_paths)
+
+    # Returns the cached git status of a project, or None if it is unknown or not shown.
+    def project_git_status(self, project: Entry) -> Optional[GitStatus]:
+        if not self._show_git_status or project.remote is not None:
+            return None
+        return self._git_status.status(project.local_path)
+
+    # Returns False if the project is known to be missing (e.g. on unmounted storage), None if unknown.
+    # Remote projects are always available, they are not checked.
+    def project_available(self, project: Entry) -> Optional[bool]:
+        local_path = project.local_path
+        if local_path is None:
+            return True
+        with self._stats.timer("existence check"):
+            state = self._existence.state(local_path)
+        # Don't format the counter name for nothing, this runs for each shown project
+        if self._stats.enabled:
+            self._stats.count(f"existence {state}")
+        return None if state == ExistenceCache.UNKNOWN else state == ExistenceCache.AVAILABLE
+
+    # Keeps the shortened paths of the loaded items, to reuse them on the next index build.
+    def _update_display_paths(self, editor: Editor):
+        index = editor.index
+        display_paths = {project.local_path: project.subtext for project in index.projects if project.remote is None}
+        display_paths.update((recent.path, recent.subtext) for recent in index.recents if recent.remote is None)
+        editor.display_paths = display_paths
+
+    # Returns the index of the current mode, or None while it is loading.
+    def current_index(self) -> Optional[Index]:
+        if self.mode == ALL_EDITORS:
+            return self._merged_index
+        editor = self._editor
+        return editor.index if editor.ready.is_set() else None
 
     # Tells albert the default trigger, may be changed by user
     def defaultTrigger(self):
         return 'vs '
 
     def configWidget(self):
-        editors = ["VSCode", "VSCode - Insiders", "VSCodium", "VSCodium - Insiders", "Cursor", "Windsurf", "Windsurf - Next"]
+        editors = list(EDITORS) + [ALL_EDITORS]
         return [
             {"type": "label", "text": "Select Mode:"},
             {
@@ -92,6 +1928,13 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
                     "currentIndex": editors.index(self.mode) if self.mode in editors else 0
                 },
             },
+            {"type": "label", "text": "Diagnostics:"},
+            {
+                "type": "checkbox",
+                "label": "Collect statistics (shown by the ':stats' query)",
+                "property": "collect_stats",
+                "value": self._stats.enabled
+            },
             {"type": "label", "text": "Git Settings:"},
             {
                 "type": "checkbox",
@@ -99,6 +1942,12 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
                 "property": "extract_worktrees",
                 "value": self._extract_worktrees
             },
+            {
+                "type": "checkbox",
+                "label": "Show Git Status of Projects",
+                "property": "show_git_status",
+                "value": self._show_git_status
+            },
             {
                 "type": "lineedit",
                 "label": "Git Executable Path",
@@ -126,6 +1975,17 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
         self.writeConfig("mode", value)
         self.updateMode()
 
+    @property
+    def collect_stats(self):
+        return self._stats.enabled
+
+    @collect_stats.setter
+    def collect_stats(self, value):
+        self._stats.enabled = value
+        self.writeConfig("collect_stats", value)
+        if not value:
+            self._stats.reset()
+
     @property
     def extract_worktrees(self):
         return self._extract_worktrees
@@ -134,6 +1994,19 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
     def extract_worktrees(self, value):
         self._extract_worktrees = value
         self.writeConfig("extract_worktrees", value)
+        self.reload_projects()
+
+    @property
+    def show_git_status(self):
+        return self._show_git_status
+
+    @show_git_status.setter
+    def show_git_status(self, value):
+        self._show_git_status = value
+        self.writeConfig("show_git_status", value)
+        index = self.current_index()
+        if value and index is not None:
+            self._check_projects(index)
 
     @property
     def git_executable(self):
@@ -143,6 +2016,7 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
     def git_executable(self, value):
         self._git_executable = value
         self.writeConfig("git_executable", value)
+        self.reload_projects()
 
     @property
     def worktree_name_template(self):
@@ -152,77 +2026,124 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
     def worktree_name_template(self, value):
         self._worktree_name_template = value if value else "{name}:{branch}"
         self.writeConfig("worktree_name_template", value)
+        self.reload_projects()
 
-    def updateMode(self):
-        # Editor configurations
-        EDITORS = {
-            "VSCode": {
-                "icon_prefix": "icon",
-                "config_dir": "Code",
-                "executable": "code"
-            },
-            "VSCode - Insiders": {
-                "icon_prefix": "insiders",
-                "config_dir": "Code - Insiders",
-                "executable": "code-insiders"
-            },
-            "VSCodium": {
-                "icon_prefix": "codium-icon",
-                "config_dir": "VSCodium",
-                "executable": "codium"
-            },
-            "VSCodium - Insiders": {
-                "icon_prefix": "codium-insiders-icon",
-                "config_dir": "VSCodium - Insiders",
-                "executable": "codium-insiders"
-            },
-            "Cursor": {
-                "icon_prefix": "cursor-icon",
-                "config_dir": "Cursor",
-                "executable": ["cursor", "cursor.AppImage"]
-            },
-            "Windsurf": {
-                "icon_prefix": "windsurf-icon",
-                "config_dir": "Windsurf",
-                "executable": "windsurf"
-            },
-            "Windsurf - Next": {
-                "icon_prefix": "windsurf-next-icon",
-                "config_dir": "Windsurf - Next",
-                "executable": "windsurf-next"
-            }
-        }
+    # Starts checking in background if the worktrees of the projects changed, they aren't part of the projects
+    # files signature. The projects are reloaded then, the unchanged repositories are read from the cache.
+    def refresh_worktrees(self):
+        now = time.monotonic()
+        if not self._extract_worktrees or self._checking_worktrees:
+            return
+        if now - self._worktrees_checked_at < self.WORKTREE_CHECK_INTERVAL:
+            return
+        self._worktrees_checked_at = now
+        self._checking_worktrees = True
+        threading.Thread(target=self._check_worktrees, name="vscode-worktrees-check", daemon=True).start()
 
-        # Get editor config, default to Windsurf if mode not found
-        editor = EDITORS.get(self.mode, EDITORS["Windsurf"])
-        
-        # Set icons
-        icons_dir = Path(__file__).parent / "icons"
-        self.ICON_PROJECT = icons_dir / f"{editor['icon_prefix']}_project.png"
-        self.ICON = icons_dir / f"{editor['icon_prefix']}.png"
+    def _check_worktrees(self):
+        try:
+            if self._worktrees.changed():
+                self.reload_projects()
+        finally:
+            self._checking_worktrees = False
 
-        # Set paths
-        config_base = Path.home() / ".config" / editor["config_dir"] / "User" / "globalStorage"
-        self.VSCODE_RECENT_PATH = config_base / "storage.json"
-        self.VSCODE_PROJECTS_PATH = config_base / "alefragnani.project-manager" / "projects.json"
+    # Reloads the projects of all the editors in background, after a change of the settings they depend on.
+    def reload_projects(self):
+        for editor in self.started_editors():
+            editor.projects.refresh(force=True)
 
-        # Set executable
-        if isinstance(editor["executable"], list):
-            self.EXECUTABLE = next((exe for exe in map(which, editor["executable"]) if exe), "")
+    # Switches the editor used by the queries, it is loaded in background if it isn't already.
+    def updateMode(self):
+        # Editors installed since the plugin started are found when the mode is changed
+        if self.mode == ALL_EDITORS:
+            for editor in self._editors.values():
+                editor.find_executable()
+                if editor.installed:
+                    self._start_loading(editor)
+            # New windows are opened in the first installed editor
+            editor = next((editor for editor in self._editors.values() if editor.executable), self._editors["VSCode"])
         else:
-            self.EXECUTABLE = which(editor["executable"]) or ""
-
-    # Returns the following tuple: (recent files paths, recent folders paths).
+            # Get editor, default to Windsurf if mode not found
+            editor = self._editors.get(self.mode, self._editors["Windsurf"])
+            editor.find_executable()
+
+        self.ICON_PROJECT = editor.icon_project
+        self.ICON = editor.icon
+        self.EXECUTABLE = editor.executable
+        self._editor = editor
+        self._start_loading(editor)
+        if self.mode == ALL_EDITORS:
+            threading.Thread(target=self._merge_indexes, name="vscode-merge", daemon=True).start()
+
+    # Returns the files the recent items are loaded from: the state database with its write-ahead log,
+    # and storage.json used as fallback.
+    def recent_source_paths(self, editor: Editor) -> List[Path]:
+        return [editor.state_path, editor.state_path.with_name("state.vscdb-wal"), editor.recent_path]
+
+    # Returns the following tuple:
+    # (recent files paths, recent folders paths, recent workspaces paths, labels, workspaces folder names).
+    # Local items are paths, remote ones are URIs. Labels are the names given by the editor to some items.
+    # The editor writes its state database for unrelated UI state all the time: if the raw history didn't
+    # change, the current value is returned as is, so the index built from it is kept.
     def get_visual_studio_code_recent(
-        self,
+        self, editor: Editor
+    ) -> Tuple[List[str], List[str], List[str], Dict[str, str], Dict[str, List[str]]]:
+        previous = editor.recent.value
+        recent, raw = None, None
+        if editor.state_path.exists():
+            try:
+                history = editor.state_database.read(editor.state_path, self.RECENT_HISTORY_KEY)
+                if history is not None:
+                    recent = tuple(previous[:4]) if history == editor.recent_raw else self.parse_recent_history(history)
+                    raw = history
+            except (sqlite3.Error, ValueError, TypeError, AttributeError) as e:
+                warning(f"Failed to read recent items from {editor.state_path}: {str(e)}")
+        if recent is None:
+            raw = editor.storage.read(editor.recent_path, self.STORAGE_KEYS)
+            recent = tuple(previous[:4]) if raw == editor.recent_raw else self.get_menubar_recent(editor) + ({},)
+        with self._stats.timer("workspaces read"):
+            workspace_folders = editor.workspaces.folders(recent[2])
+
+        unchanged = raw == editor.recent_raw and workspace_folders == previous[4]
+        editor.recent_raw = raw
+        if unchanged:
+            self._stats.count("recent items unchanged")
+            return previous
+        return recent + (workspace_folders,)
+
+    # Parses the recent items history of the state database.
+    @staticmethod
+    def parse_recent_history(history: str) -> Tuple[List[str], List[str], List[str], Dict[str, str]]:
+        files, folders, workspaces, labels = [], [], [], {}
+        for entry in json.loads(history).get("entries", []):
+            if "fileUri" in entry:
+                uri, paths = entry["fileUri"], files
+            elif "folderUri" in entry:
+                uri, paths = entry["folderUri"], folders
+            elif "workspace" in entry:
+                uri, paths = entry["workspace"].get("configPath"), workspaces
+            else:
+                continue
+            if not isinstance(uri, str) or not uri:
+                continue
+            path = uri_to_path(uri)
+            paths.append(path)
+            if entry.get("label"):
+                labels[path] = entry["label"]
+        return files, folders, workspaces, labels
+
+    # Returns the following tuple: (recent files paths, recent folders paths, recent workspaces paths),
+    # from the File > Open Recent menu saved in storage.json.
+    def get_menubar_recent(
+        self, editor: Editor
     ) -> Tuple[List[str], List[str], List[str]]:
-        storage = json.load(open(self.VSCODE_RECENT_PATH, "r"))
+        storage = editor.storage.read(editor.recent_path, self.STORAGE_KEYS)
         menu_items = storage["lastKnownMenubarData"]["menus"]["File"]["items"]
         file_menu_items = list(filter(lambda item: item["id"] == "submenuitem.MenubarRecentMenu", menu_items))
         submenu_recent_items = file_menu_items[0]["submenu"]["items"]
         files = list(filter(lambda item: item["id"] == "openRecentFile" and item["enabled"] == True, submenu_recent_items))
         folders = list(filter(lambda item: item["id"] == "openRecentFolder" and item["enabled"] == True, submenu_recent_items))
-        extract_path = lambda item: item["uri"]["path"]
+        extract_path = lambda item: menubar_uri_to_path(item["uri"])
         files_paths = list(map(extract_path, files))
         folders_paths = list(map(extract_path, folders))
 
@@ -234,9 +2155,9 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
         return files_paths, folders_paths, workspaces_paths
 
     # Return favorite projects
-    def get_favorite_projects(self) -> List[dict]:
+    def get_favorite_projects(self, editor: Editor) -> List[dict]:
         try:
-            projects_path = self.VSCODE_PROJECTS_PATH
+            projects_path = editor.projects_path
             if not projects_path.exists():
                 return []
 
@@ -246,53 +2167,44 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
             if not self.extract_worktrees:
                 return projects
 
-            # Process git worktrees for each project
+            projects = [project for project in projects if project.get('enabled', True)]
+
+            # Find git worktrees of all the local projects at once
+            local_paths = [
+                project.get('rootPath', '') for project in projects
+                if project.get('rootPath') and '://' not in project['rootPath']
+            ]
+            worktrees = self._worktrees.find(local_paths)
+
             expanded_projects = []
             for project in projects:
-                project_enabled = project.get('enabled', True)
-                if not project_enabled:
+                project_worktrees = worktrees.get(project.get('rootPath', ''))
+                if not project_worktrees:
+                    expanded_projects.append(project)  # Add non-git projects and errors as is
                     continue
 
-                project_path = Path(project.get('rootPath', ''))
-                git_dir = project_path / '.git'
-
-                # If project has .git, check for worktrees
-                if git_dir.exists():
-                    try:
-                        # Get all worktrees
-                        worktrees_output = subprocess.check_output(
-                            [self.git_executable, 'worktree', 'list'],
-                            cwd=project_path,
-                            text=True
-                        ).splitlines()
-
-                        # Process each worktree
-                        for line in worktrees_output:
-                            if not line.strip():
-                                continue
-                            parts = line.split()
-                            if len(parts) >= 3:
-                                wt_path = parts[0]
-                                wt_branch = parts[2].strip('[]')
-                                # Create a copy of the project for each worktree
-                                wt_project = project.copy()
-                                wt_project['rootPath'] = wt_path
-                                wt_project['name'] = self.worktree_name_template.format(
-                                    name=project['name'],
-                                    branch=wt_branch
-                                )
-                                expanded_projects.append(wt_project)
-                    except (subprocess.CalledProcessError, OSError) as e:
-                        warning(f"Error processing git worktrees for {project_path}: {str(e)}")
-                        expanded_projects.append(project)  # Add original project on error
-                else:
-                    expanded_projects.append(project)  # Add non-git projects as is
+                for wt_path, wt_branch in project_worktrees:
+                    # Only keep the indexed fields of the project for each worktree, sharing its tags
+                    expanded_projects.append({
+                        'name': self.worktree_name_template.format(name=project['name'], branch=wt_branch),
+                        'rootPath': wt_path,
+                        'tags': project.get('tags', []),
+                    })
 
             return expanded_projects
         except Exception as e:
             warning(f"Error reading Project Manager settings: {str(e)}")
             return []
 
+    # Returns the shortened `path` shown in the items subtext.
+    # `display_paths` are the ones computed by the previous index build.
+    def display_path(self, display_paths: Dict[str, str], path: str) -> str:
+        display_path = display_paths.get(path)
+        if display_path is None:
+            self._stats.count("display path miss")
+            display_path = self.resize_path(path)
+        return display_path
+
     # Returns the abbreviation of `path` that has `maxchars` character size.
     def resize_path(self, path: str | Path, maxchars: int = 45) -> str:
         filepath = Path(path)
@@ -317,10 +2229,57 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
                     break
             return "...{}".format(short_path)
 
+    # Returns the frecency ranks of the index items, computed again only after launches or reloads.
+    def frecency_ranks(self, index: Index) -> FrecencyRanks:
+        self._frecency.load_async()
+        version = self._frecency.version
+        cached = self._frecency_ranks
+        if cached is not None and cached[0] is index and cached[1] == version:
+            return cached[2]
+        self._stats.count("frecency ranks computed")
+        ranks = index.frecency_ranks(self._frecency.scores())
+        self._frecency_ranks = (index, version, ranks)
+        return ranks
+
+    # Opens an item in the editor and records the launch.
+    def launch(self, cmdln: List[str], uri: str):
+        runDetachedProcess(cmdln=cmdln)
+        self._frecency.record(uri)
+
+    # Returns the items showing the collected statistics.
+    def make_stats_items(self) -> List[Item]:
+        if not self._stats.enabled:
+            return [self.make_item("Statistics are disabled", "Enable 'Collect statistics' in the plugin settings")]
+
+        summary = self._stats.summary()
+        items = [self.make_item(
+            "Statistics", "Latencies of the last queries and reloads",
+            [Action(id="dump", text="Write statistics to stats.json", callable=self.dump_stats),
+             Action(id="reset", text="Reset statistics", callable=self._stats.reset)]
+        )]
+        for name, timing in summary["timings"].items():
+            items.append(self.make_item(
+                f"{name}: p50 {timing['p50']:.2f} ms, p95 {timing['p95']:.2f} ms, max {timing['max']:.2f} ms",
+                f"{timing['count']} samples"
+            ))
+        for name, value in summary["counters"].items():
+            items.append(self.make_item(f"{name}: {value}", "Counter"))
+        return items
+
+    # Writes the collected statistics to stats.json in the plugin data directory.
+    def dump_stats(self):
+        path = Path(self.dataLocation()) / "stats.json"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(self._stats.summary(), f, indent=2)
+        except OSError as e:
+            warning(f"Failed to write statistics: {str(e)}")
+
     # Return a item.
-    def make_item(self, text: str, subtext: str = "", actions: List[Action] = []) -> StandardItem:
+    def make_item(self, text: str, subtext: str = "", actions: List[Action] = [], icon: Optional[Path] = None) -> StandardItem:
         # Capture icon path as string to avoid issues with Path objects in lambdas
-        icon_path = str(self.ICON)
+        icon_path = str(icon or self.ICON)
         return StandardItem(id=self.id(), icon_factory=lambda: Icon.image(icon_path), text=text, subtext=subtext, actions=actions)
 
     # Return an item that create a new window.
@@ -332,183 +2291,270 @@ class Plugin(PluginInstance, GeneratorQueryHandler):
             [Action(id=self.id(), text="Open in Visual Studio Code", callable=lambda: runDetachedProcess(cmdln=[exe, "-n"]))]
         )
 
-    # Return a recent item.
-    def make_recent_item(self, path: str | Path, recent_type: Literal["File", "Folder"]) -> Item:
-        resized_path = self.resize_path(path)
-        path_splits = resized_path.split("/")
-        working_dir_path, filename = path_splits[:-1], path_splits[-1]
-        formatted_path = "{}/{}".format("/".join(working_dir_path), filename)
-
+    # Return a recent item, opened in `editor` or else in the editor of the current mode.
+    def make_recent_item(self, path: str, recent_type: Literal["File", "Folder"], title: str, subtext: str, uri: str,
+                         editor: Optional[Editor] = None) -> Item:
+        editor = editor or self._editor
         uri_flag = "--file-uri" if recent_type == "File" else "--folder-uri"
         # Capture values to avoid closure issues
-        exe = self.EXECUTABLE
-        path_uri = Path(path).as_uri()
-        path_id = str(path)
+        exe = editor.executable
+        launch_uri = project_uri(path)
         return self.make_item(
-            "{}: {}".format(recent_type, path_splits[-1]), formatted_path,
-            [Action(id=path_id, text="Open in Visual Studio Code",
-                    callable=lambda u=uri_flag, p=path_uri: runDetachedProcess(cmdln=[exe, u, p]))]
+            title, subtext,
+            [Action(id=path, text="Open in Visual Studio Code",
+                    callable=lambda u=uri_flag, p=uri: self.launch([exe, u, p], launch_uri))],
+            editor.icon
         )
 
-    # Return a recent item.
-    def make_project_item(self, path: str, name: str) -> Item:
-        resized_path = self.resize_path(path)
-        path_splits = resized_path.split("/")
-        working_dir_path, filename = path_splits[:-1], path_splits[-1]
-        formatted_path = "{}/{}".format("/".join(working_dir_path), filename)
+    # Return a project item, opened in `editor` or else in the editor of the current mode.
+    # `available` is None if the project path existence is unknown.
+    def make_project_item(self, path: str, name: str, subtext: str, available: Optional[bool] = True,
+                          editor: Optional[Editor] = None, git_status: Optional[GitStatus] = None) -> Item:
+        editor = editor or self._editor
+        if git_status is not None:
+            subtext += f" [{git_status.describe()}]"
+        if available is None:
+            subtext += " (availability unknown)"
 
         # Capture icon path as string and executable to avoid closure issues
-        icon_path = str(self.ICON_PROJECT)
-        exe = self.EXECUTABLE
+        icon_path = str(editor.icon_project)
+        exe = editor.executable
         return StandardItem(
-            id=self.id(), icon_factory=lambda: Icon.image(icon_path), text=name, subtext=formatted_path,
+            id=self.id(), icon_factory=lambda: Icon.image(icon_path), text=name, subtext=subtext,
             actions=[Action(id=path, text="Open in Visual Studio Code",
-                            callable=lambda p=path: runDetachedProcess(cmdln=[exe, '--folder-uri', p]))]
+                            callable=lambda p=path: self.launch([exe, '--folder-uri', p], p))]
         )
 
+    # Returns the items built for the current index and mode, built again only when they change.
+    def cached_item(self, index: Index, key: tuple, factory: Callable[[], Item]) -> Item:
+        return self._item_cache.get((index, self.mode, self.EXECUTABLE), key, factory)
+
+    # Returns the editor an item comes from, or None for the editor of the current mode.
+    # Items of editors that are not in PATH are opened in the current one.
+    def item_editor(self, name: Optional[str]) -> Optional[Editor]:
+        editor = self._editors.get(name) if name else None
+        return editor if editor is not None and editor.executable else None
+
+    def project_item(self, index: Index, project_id: int, available: Optional[bool]) -> Item:
+        project = index.projects[project_id]
+        git_status = self.project_git_status(project)
+        # The last commit age shown in the status is rounded to minutes, the item is built again when it changes
+        age = int(time.time() // 60) if git_status is not None and git_status.committed_at is not None else None
+        return self.cached_item(index, ("project", project_id, available, git_status, age), lambda: self.make_project_item(
+            project.uri, project.name, project.subtext, available, self.item_editor(project.editor), git_status
+        ))
+
+    def recent_item(self, index: Index, recent_id: int) -> Item:
+        recent = index.recents[recent_id]
+        return self.cached_item(index, ("recent", recent_id), lambda: self.make_recent_item(
+            recent.path, recent.kind, recent.title, recent.subtext, recent.uri, self.item_editor(recent.editor)
+        ))
+
+    # Returns True if `filters` extends `previous`: same filters with more characters in the last one,
+    # and maybe more filters. The items matching `filters` are then a subset of the ones matching `previous`.
+    @staticmethod
+    def extends_filters(filters: List[str], previous: List[str]) -> bool:
+        if not previous or len(filters) < len(previous):
+            return False
+        if filters[:len(previous) - 1] != previous[:-1] or not filters[len(previous) - 1].startswith(previous[-1]):
+            return False
+        # Type filters aren't matched as substrings
+        return not any(f in RECENT_TYPE_FILTERS for f in previous + filters)
+
+    # Returns the filters to apply to the recent items, and the ids of the items of the type they select.
+    @staticmethod
+    def recent_filters(index: Index, filters: List[str]) -> Tuple[List[str], Optional[AbstractSet[int]]]:
+        filters = filters.copy()
+        if 'folder' in filters:
+            filters.remove('folder')
+            return filters, index.folder_ids
+        if 'file' in filters:
+            filters.remove('file')
+            return filters, index.file_ids
+        return filters, None
+
+    # Returns the ids matching `terms`, by narrowing `previous` if given. Fuzzy matches are only
+    # searched when there are not enough substring matches, they would be ranked after them anyway.
+    def match(self, search_index: TrigramIndex, terms: List[str], previous: Optional[Matches] = None,
+              within: Optional[AbstractSet[int]] = None) -> Matches:
+        if previous is not None:
+            matches = Matches(search_index.narrow(previous.ids, terms, previous.fuzzy), previous.fuzzy)
+        else:
+            matches = Matches(search_index.search(terms, within), False)
+        if not matches.fuzzy and len(matches.ids) < self.FUZZY_THRESHOLD:
+            matches = Matches(search_index.search(terms, within, fuzzy=True), True)
+        return matches
+
+    # Returns the project matches without the fuzzy ones if any project or recent item matches `filters`
+    # as a substring. Projects are listed first, a weak fuzzy project match would be shown above them.
+    @classmethod
+    def without_fuzzy_projects(cls, index: Index, filters: List[str], project_matches: Matches,
+                               recent_matches: Matches) -> Matches:
+        if not project_matches.fuzzy:
+            return project_matches
+        project_ids = index.project_search.filter(project_matches.ids, filters)
+        if project_ids or not recent_matches.fuzzy or index.recent_search.filter(
+            recent_matches.ids, cls.recent_filters(index, filters)[0]
+        ):
+            # Not fuzzy anymore, the next query searches the fuzzy project matches again if it needs them
+            return Matches(project_ids, False)
+        return project_matches
+
+    # Returns the projects and recent items matching `filters`.
+    def search(self, index: Index, filters: List[str]) -> Tuple[Matches, Matches]:
+        last_search = self._last_search
+        if last_search is not None and last_search[0] is index:
+            _, previous, project_matches, recent_matches = last_search
+            if filters == previous:
+                self._stats.count("search repeated")
+                return project_matches, recent_matches
+            if self.extends_filters(filters, previous):
+                self._stats.count("search narrowed")
+                project_matches = self.match(index.project_search, filters, project_matches)
+                recent_matches = self.match(index.recent_search, filters, recent_matches)
+                project_matches = self.without_fuzzy_projects(index, filters, project_matches, recent_matches)
+                self._last_search = (index, filters, project_matches, recent_matches)
+                return project_matches, recent_matches
+
+        self._stats.count("search full")
+        project_matches = self.match(index.project_search, filters)
+        recent_terms, recent_type_ids = self.recent_filters(index, filters)
+        recent_matches = self.match(index.recent_search, recent_terms, within=recent_type_ids)
+        project_matches = self.without_fuzzy_projects(index, filters, project_matches, recent_matches)
+
+        self._last_search = (index, filters, project_matches, recent_matches)
+        return project_matches, recent_matches
+
+    # Yields the items of the projects and recent items, ranked for `filters` if there are some.
+    def result_items(self, index: Index, ranks: FrecencyRanks, filters: List[str]) -> Iterator[Item]:
+        # If query is empty, show all items, most frequently and recently opened first
+        if not filters:
+            project_ids = ranks.project_order
+            recent_ids = ranks.recent_order
+        else:
+            with self._stats.timer("search"):
+                project_matches, recent_matches = self.search(index, filters)
+            # Each filter must match a tag or the project name, best matches first
+            project_ids = index.project_search.ranked(
+                project_matches.ids, filters, project_matches.fuzzy, ranks.project_bonus
+            )
+            recent_ids = index.recent_search.ranked(
+                recent_matches.ids, self.recent_filters(index, filters)[0], recent_matches.fuzzy, ranks.recent_bonus
+            )
+
+        # Add favorite projects
+        for project_id in project_ids:
+            # Skip missing projects, e.g. on unmounted storage
+            available = self.project_available(index.projects[project_id])
+            if available is False:
+                continue
+
+            with self._stats.timer("item construction"):
+                yield self.project_item(index, project_id, available)
+
+        if filters and not index.recents:
+            yield self.make_item("Recent Files and Folders not found")
+            return
+
+        # Add recent items
+        for recent_id in recent_ids:
+            with self._stats.timer("item construction"):
+                yield self.recent_item(index, recent_id)
+
+    # Returns the (path, editor name) of the local project or recent folder best matching `name`,
+    # or None if there is none.
+    def file_root(self, index: Index, name: str) -> Optional[Tuple[str, Optional[str]]]:
+        terms = [name]
+        for project_id in index.project_search.ranked(index.project_search.search(terms), terms):
+            project = index.projects[project_id]
+            path = project.local_path
+            if path and self.project_available(project) is not False:
+                return path, project.editor
+        folder_ids = index.recent_search.search(terms, index.folder_ids)
+        for recent_id in index.recent_search.ranked(folder_ids, terms):
+            recent = index.recents[recent_id]
+            path = recent.local_path
+            if path and path.startswith('/') and not path.endswith(".code-workspace"):
+                return path, recent.editor
+        return None
+
+    # Yields the items of the files of `root` matching `terms`, best matches first.
+    def file_items(self, root: str, editor: Optional[Editor], terms: List[str]) -> Iterator[Item]:
+        file_list = self._files.get(root)
+        if file_list is None:
+            yield self.make_item(f"Indexing files of {root}...", "Files are indexed in background, type again to see them")
+            return
+
+        with self._stats.timer("file search"):
+            file_ids = file_list.search(terms)
+        if not file_ids:
+            yield self.make_item("No files found", f"No file of {root} matches the query")
+            return
+        for file_id in file_list.ranked(file_ids, terms) if terms else file_ids:
+            with self._stats.timer("item construction"):
+                path = os.path.join(root, file_list.path(file_id))
+                yield self.make_recent_item(
+                    path, "File", f"File: {file_list.file_names[file_id]}", self.resize_path(path),
+                    path_to_uri(path), editor
+                )
+
+    # Groups `items` in lists, the first one is smaller to be shown as soon as possible.
+    def batched(self, items: Iterator[Item], first: List[Item]) -> Iterator[List[Item]]:
+        batch, batch_size = first, self.FIRST_BATCH_SIZE
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch, batch_size = [], self.BATCH_SIZE
+        if batch:
+            yield batch
+
     def items(self, context: QueryContext) -> Generator[List[Item]]:
+        if context.query.strip() == ":stats":
+            yield self.make_stats_items()
+            return
+
         if not self.EXECUTABLE:
+            if self.mode == ALL_EDITORS:
+                yield [self.make_item("No editor found", "Please install an editor or check your mode in settings")]
+                return
             yield [self.make_item(
                 f"{self.mode} not found",
                 f"Please install {self.mode} or check your mode in settings"
             )]
             return
 
-        query_text = context.query.strip().lower()
-
-        # Use cached data
-        files, folders, workspaces = self._cached_files, self._cached_folders, self._cached_workspaces
-        projects = self._cached_projects
-
-        # Collect all items in a list first, then yield them all at once
-        items = []
-        
-        # Limit total items to prevent UI freeze
-        MAX_ITEMS = 50
-
-        # Always show "New Window" item first
-        items.append(self.make_new_window_item())
-
-        # If query is empty, show all items (limited)
-        if not query_text:
-            # Add all enabled projects
-            for project in projects:
-                if len(items) >= MAX_ITEMS:
-                    break
-                project_path = project.get('rootPath', '')
-                project_enabled = project.get('enabled', True)
-
-                if not project_enabled or not project_path:
-                    continue
-
-                if not project_path.startswith(('vscode:', 'file:')):
-                    project_path = f"file://{project_path}"
-
-                if project_path.startswith('file:'):
-                    fs_path = Path(project_path.replace('file://', '', 1))
-                    if not fs_path.exists():
-                        continue
-
-                items.append(self.make_project_item(project_path, project.get('name', '')))
-
-            # Add recent items (limited)
-            recent_items = list(dict.fromkeys(files + folders + workspaces))
-            for path in recent_items:
-                if len(items) >= MAX_ITEMS:
-                    break
-                if not path:
-                    continue
-
-                if path in files:
-                    items.append(self.make_recent_item(path, "File"))
-                else:
-                    items.append(self.make_recent_item(path, "Folder"))
+        # Reload changed sources in background, and use the cached index meanwhile
+        for editor in self.started_editors():
+            editor.recent.refresh()
+            editor.projects.refresh()
+        self.refresh_worktrees()
 
-            # Yield all items at once
-            yield items
+        index = self.current_index()
+        if index is None:
+            yield [self.make_new_window_item(), self.make_item("Still indexing...", "Recent items and projects are loading")]
             return
 
+        started = time.perf_counter()
         # Split query into multiple filters
-        filters = query_text.split()
-
-        # Process favorite projects
-        for project in projects:
-            if len(items) >= MAX_ITEMS:
-                break
-            project_name = project.get('name', '').lower()
-            project_path = project.get('rootPath', '')
-            project_enabled = project.get('enabled', True)
-            project_tags = project.get('tags', [])
-
-            if not project_enabled or not project_name or not project_path:
-                continue
-
-            # Apply each filter sequentially
-            match = True
-            remaining_filters = filters.copy()
-
-            # First check tags and remove matching ones from filters
-            for tag in project_tags:
-                tag = tag.lower()
-                if tag in remaining_filters:
-                    remaining_filters.remove(tag)
-
-            # Then check if all remaining filters match the project name
-            for filter_text in remaining_filters:
-                if filter_text not in project_name:
-                    match = False
-                    break
-
-            if not match:
-                continue
-
-            if not project_path.startswith(('vscode:', 'file:')):
-                project_path = f"file://{project_path}"
-
-            if project_path.startswith('file:'):
-                fs_path = Path(project_path.replace('file://', '', 1))
-                if not fs_path.exists():
-                    continue
-
-            items.append(self.make_project_item(project_path, project.get('name', '')))
-
-        if not folders and not files and not workspaces:
-            items.append(self.make_item("Recent Files and Folders not found"))
-            yield items
-            return
-
-        # Process recent items
-        recent_items = []
-        if 'folder' in filters:
-            filters.remove('folder')
-            recent_items = list(dict.fromkeys(folders + workspaces))
-        elif 'file' in filters:
-            filters.remove('file')
-            recent_items = files
+        filters = context.query.strip().lower().split()
+
+        # "project/ fragments" searches the files of a project or recent folder
+        root = None
+        if filters and filters[0].endswith("/") and filters[0] != "/":
+            root = self.file_root(index, filters[0].rstrip("/"))
+        if root is not None:
+            path, editor_name = root
+            results = self.file_items(path, self.item_editor(editor_name), filters[1:])
         else:
-            recent_items = list(dict.fromkeys(files + folders + workspaces))
+            results = self.result_items(index, self.frecency_ranks(index), filters)
 
-        # Apply remaining filters to recent items
-        for path in recent_items:
-            if len(items) >= MAX_ITEMS:
-                break
-            if not path:
-                continue
-
-            path_lower = path.lower()
-            match = True
-            for filter_text in filters:
-                if filter_text not in path_lower:
-                    match = False
-                    break
-
-            if not match:
-                continue
-
-            if path in files:
-                items.append(self.make_recent_item(path, "File"))
-            else:
-                items.append(self.make_recent_item(path, "Folder"))
-
-        # Yield all items at once to avoid UI locking
-        yield items
+        # Always show "New Window" item first
+        new_window_item = self.cached_item(index, ("new window",), self.make_new_window_item)
+
+        # Yield the results in batches, the next ones are only built if albert pulls them
+        batches = self.batched(results, [new_window_item])
+        for number, batch in enumerate(batches):
+            if number == 0:
+                self._stats.add("first batch", time.perf_counter() - started)
+            yield batch
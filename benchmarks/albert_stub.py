@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal stand-in for the `albert` module, enough to load and query the plugin outside of albert.
+It is installed in `sys.modules` by the benchmark before the plugin is imported.
+"""
+
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Names exported to the plugin by `from albert import *`
+__all__ = [
+    "debug", "info", "warning", "critical", "runDetachedProcess", "setClipboardText",
+    "PluginInstance", "GeneratorQueryHandler", "QueryContext", "Item", "Action", "StandardItem", "Icon",
+]
+
+# Config values returned by `PluginInstance.readConfig`, set by the benchmark
+config: Dict[str, Any] = {}
+# Base directory of the plugin data, cache and config locations
+locations_dir = Path("/tmp/albert-vscode-bench")
+# Command lines passed to `runDetachedProcess`
+launched: List[List[str]] = []
+# Minimal level of the printed log messages, warnings by default
+log_level = 2
+
+
+def _log(level: int, message: str):
+    if level >= log_level:
+        print(message, file=sys.stderr)
+
+
+def debug(message: str):
+    _log(0, f"debug: {message}")
+
+
+def info(message: str):
+    _log(1, f"info: {message}")
+
+
+def warning(message: str):
+    _log(2, f"warning: {message}")
+
+
+def critical(message: str):
+    _log(3, f"critical: {message}")
+
+
+def runDetachedProcess(cmdln: List[str], workdir: str = "") -> int:
+    launched.append(list(cmdln))
+    return 0
+
+
+def setClipboardText(text: str = ""):
+    pass
+
+
+class PluginInstance:
+    def __init__(self):
+        pass
+
+    def id(self) -> str:
+        return "vscode"
+
+    def name(self) -> str:
+        return "Visual Studio Code"
+
+    def readConfig(self, key: str, type: type) -> Optional[Any]:
+        return config.get(key)
+
+    def writeConfig(self, key: str, value: Any):
+        config[key] = value
+
+    def cacheLocation(self) -> Path:
+        return locations_dir / "cache"
+
+    def configLocation(self) -> Path:
+        return locations_dir / "config"
+
+    def dataLocation(self) -> Path:
+        return locations_dir / "data"
+
+
+class GeneratorQueryHandler:
+    def __init__(self):
+        pass
+
+
+class QueryContext:
+    def __init__(self, query: str, trigger: str = "vs "):
+        self.query = query
+        self.trigger = trigger
+        self.isValid = True
+
+
+class Item:
+    pass
+
+
+class Action:
+    def __init__(self, id: str, text: str, callable: Callable[[], None]):
+        self.id = id
+        self.text = text
+        self.callable = callable
+
+
+class StandardItem(Item):
+    def __init__(self, id: str = "", text: str = "", subtext: str = "", input_action_text: str = "",
+                 icon_factory: Optional[Callable[[], Any]] = None, actions: List[Action] = []):
+        self.id = id
+        self.text = text
+        self.subtext = subtext
+        self.input_action_text = input_action_text
+        self.icon_factory = icon_factory
+        self.actions = actions
+
+
+class Icon:
+    @staticmethod
+    def image(path: str) -> str:
+        return path
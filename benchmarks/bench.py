@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the plugin outside of albert.
+
+Generates synthetic editor state (storage.json, state.vscdb, projects.json and git repositories
+with worktrees) of configurable sizes in a temporary home directory, loads the plugin with a stub
+`albert` module, and reports the latency of the startup, the reloads and of each keystroke.
+
+Usage:
+  python benchmarks/bench.py [--sizes 100,1000,10000] [--save baseline.json]
+  python benchmarks/bench.py --compare baseline.json [--tolerance 0.25]
+
+With --compare, exits with status 1 if a median or p95 latency regressed by more than the tolerance.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+PLUGIN_PATH = BENCHMARKS_DIR.parent / "__init__.py"
+
+sys.path.insert(0, str(BENCHMARKS_DIR))
+import albert_stub  # noqa: E402
+
+sys.modules["albert"] = albert_stub
+
+WORDS = [
+    "albert", "api", "app", "backend", "bench", "cache", "client", "config", "core", "docs", "editor",
+    "frontend", "git", "index", "infra", "kernel", "launcher", "lib", "main", "model", "net", "parser",
+    "plugin", "query", "runtime", "search", "server", "service", "src", "test", "tools", "ui", "utils",
+    "vscode", "web", "worker",
+]
+EXTENSIONS = ["py", "md", "json", "ts", "rs", "c", "h", "toml", "yaml", "txt"]
+
+
+# Writes synthetic editor state with `size` recent items and `projects` projects, under `home`.
+class EditorState:
+    def __init__(self, home: Path, size: int, projects: int, worktrees: int, padding_kb: int, seed: int):
+        self.home = home
+        self.rng = random.Random(seed)
+        self.size = size
+        self.projects_count = projects
+        self.worktrees = worktrees
+        self.padding_kb = padding_kb
+        self.storage_dir = home / ".config" / "Code" / "User" / "globalStorage"
+        self.repos_dir = home / "repos"
+        self.recent_paths: List[str] = []
+
+    def random_path(self, depth: int) -> str:
+        parts = [self.rng.choice(WORDS) + (str(self.rng.randrange(100)) if self.rng.random() < 0.3 else "")
+                 for _ in range(depth)]
+        return str(self.home / "src" / "/".join(parts))
+
+    def write(self):
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for i in range(self.size):
+            kind = self.rng.random()
+            if kind < 0.6:
+                path = f"{self.random_path(self.rng.randint(2, 5))}/file{i}.{self.rng.choice(EXTENSIONS)}"
+                entries.append({"fileUri": f"file://{path}"})
+            elif kind < 0.95:
+                path = f"{self.random_path(self.rng.randint(1, 4))}-{i}"
+                entries.append({"folderUri": f"file://{path}"})
+            else:
+                path = f"{self.random_path(2)}/ws{i}.code-workspace"
+                entries.append({"workspace": {"id": str(i), "configPath": f"file://{path}"}})
+            self.recent_paths.append(path)
+
+        self.write_state_database(entries)
+        self.write_storage(entries)
+        self.write_projects()
+
+    def write_state_database(self, entries: List[dict]):
+        connection = sqlite3.connect(self.storage_dir / "state.vscdb")
+        connection.execute("CREATE TABLE IF NOT EXISTS ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+        connection.execute(
+            "INSERT INTO ItemTable VALUES (?, ?)",
+            ("history.recentlyOpenedPathsList", json.dumps({"entries": entries}))
+        )
+        connection.commit()
+        connection.close()
+
+    def write_storage(self, entries: List[dict]):
+        # storage.json only has the File > Open Recent menu, plus unrelated state
+        menu = []
+        for entry in entries[:20]:
+            if "fileUri" in entry:
+                menu.append({"id": "openRecentFile", "enabled": True, "uri": {"path": entry["fileUri"][7:]}})
+            elif "folderUri" in entry:
+                menu.append({"id": "openRecentFolder", "enabled": True, "uri": {"path": entry["folderUri"][7:]}})
+        storage = {
+            "windowsState": {"lastActiveWindow": {"uiState": "x" * 200}},
+            "theme": "x" * (self.padding_kb * 1024),
+            "lastKnownMenubarData": {"menus": {"File": {"items": [
+                {"id": "workbench.action.files.newUntitledFile"},
+                {"id": "submenuitem.MenubarRecentMenu", "submenu": {"items": menu}},
+            ]}}},
+            "profileAssociations": {"workspaces": {
+                entry["workspace"]["configPath"]: "__default__profile__"
+                for entry in entries[:50] if "workspace" in entry
+            }},
+        }
+        (self.storage_dir / "storage.json").write_text(json.dumps(storage))
+
+    def write_projects(self):
+        projects = []
+        for i in range(self.projects_count):
+            name = f"{self.rng.choice(WORDS)}-{self.rng.choice(WORDS)}-{i}"
+            root = self.repos_dir / name
+            root.mkdir(parents=True, exist_ok=True)
+            self.write_git_repo(root, i)
+            projects.append({
+                "name": name, "rootPath": str(root), "paths": [],
+                "tags": self.rng.sample(["work", "personal", "oss", "rust", "python"], 2), "enabled": True,
+            })
+        manager_dir = self.storage_dir / "alefragnani.project-manager"
+        manager_dir.mkdir(parents=True, exist_ok=True)
+        (manager_dir / "projects.json").write_text(json.dumps(projects))
+
+    # Writes the git metadata of a repository with `worktrees` linked worktrees, without running git.
+    def write_git_repo(self, root: Path, i: int):
+        git_dir = root / ".git"
+        git_dir.mkdir(exist_ok=True)
+        (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+        for w in range(self.worktrees):
+            worktree = self.repos_dir / f"{root.name}-wt{w}"
+            worktree.mkdir(exist_ok=True)
+            (worktree / ".git").write_text(f"gitdir: {git_dir}/worktrees/wt{w}\n")
+            entry = git_dir / "worktrees" / f"wt{w}"
+            entry.mkdir(parents=True, exist_ok=True)
+            (entry / "gitdir").write_text(f"{worktree}/.git\n")
+            (entry / "HEAD").write_text(f"ref: refs/heads/feature-{i}-{w}\n")
+
+    # Returns typed queries: each prefix of one or two words of the recent paths and project names.
+    def keystrokes(self, count: int) -> List[str]:
+        queries = []
+        while len(queries) < count:
+            words = [word for word in self.rng.choice(self.recent_paths).lower().split("/") if word]
+            text = " ".join(self.rng.sample(words[-3:], min(len(words), self.rng.randint(1, 2))))
+            queries += [text[:n] for n in range(1, len(text) + 1)]
+        return queries[:count]
+
+
+def load_plugin_module():
+    spec = importlib.util.spec_from_file_location("albert_vscode_bench", PLUGIN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    at = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {
+        "count": len(samples),
+        "p50": at(0.50) * 1000,
+        "p95": at(0.95) * 1000,
+        "p99": at(0.99) * 1000,
+        "max": samples[-1] * 1000,
+        "mean": statistics.fmean(samples) * 1000,
+    }
+
+
+def timed(function: Callable, repeat: int = 1) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# Pulls the first batch only, as albert does until the results are scrolled.
+def run_query(plugin, query: str):
+    next(plugin.items(albert_stub.QueryContext(query)), None)
+
+
+# Runs all the measures for one size, returns {measure: percentiles}.
+def bench_size(args, size: int) -> Dict[str, Dict[str, float]]:
+    root = Path(tempfile.mkdtemp(prefix=f"albert-vscode-bench-{size}-"))
+    try:
+        home = root / "home"
+        state = EditorState(home, size, args.projects, args.worktrees, args.padding_kb, args.seed)
+        state.write()
+
+        bin_dir = root / "bin"
+        bin_dir.mkdir()
+        executable = bin_dir / "code"
+        executable.write_text("#!/bin/sh\n")
+        executable.chmod(0o755)
+
+        os.environ["HOME"] = str(home)
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+        albert_stub.locations_dir = root / "albert"
+        albert_stub.config.clear()
+        albert_stub.config.update(mode="VSCode", extract_worktrees=args.worktrees > 0)
+        module = load_plugin_module()
+
+        results = {}
+
+        # Startup, until the index is ready, without and then with a snapshot of the previous session
+        def start():
+            plugin = module.Plugin()
+            plugin._editor.ready.wait()
+            return plugin
+        results["cold_start"] = percentiles(timed(start))
+        # Let the first session write its snapshot
+        time.sleep(0.2)
+        plugin = None
+
+        def warm_start():
+            nonlocal plugin
+            plugin = start()
+        results["warm_start"] = percentiles(timed(warm_start, args.repeat))
+
+        # Reloads of each source, including the index rebuild. The raw recent history is forgotten first,
+        # an unchanged one is not parsed again.
+        def reload_recent():
+            plugin._editor.recent_raw = None
+            plugin._editor.recent.value = ()
+            plugin._editor.recent.reload()
+
+        def get_visual_studio_code_recent():
+            plugin._editor.recent_raw = None
+            plugin.get_visual_studio_code_recent(plugin._editor)
+        results["reload_recent"] = percentiles(timed(reload_recent, args.repeat))
+        # Reload after a write of the state database that didn't change the history
+        results["reload_recent_unchanged"] = percentiles(timed(plugin._editor.recent.reload, args.repeat))
+        results["reload_projects"] = percentiles(timed(plugin._editor.projects.reload, args.repeat))
+        results["get_visual_studio_code_recent"] = percentiles(timed(get_visual_studio_code_recent, args.repeat))
+        results["get_favorite_projects"] = percentiles(timed(lambda: plugin.get_favorite_projects(plugin._editor), args.repeat))
+
+        # storage.json fallback, with a new reader each time so the file is read again
+        def read_storage():
+            plugin._editor.storage = module.StorageReader()
+            plugin.get_menubar_recent(plugin._editor)
+        results["get_menubar_recent"] = percentiles(timed(read_storage, args.repeat))
+
+        paths = state.recent_paths[:1000]
+        results["resize_path"] = percentiles(
+            [sample / len(paths) for sample in timed(lambda: [plugin.resize_path(p) for p in paths], args.repeat)]
+        )
+
+        # Let the background existence checks finish, they are not part of the query latency
+        time.sleep(0.5)
+        keystrokes = state.keystrokes(args.keystrokes)
+        results["empty_query"] = percentiles(timed(lambda: run_query(plugin, ""), args.repeat))
+        results["keystroke"] = percentiles([timed(lambda: run_query(plugin, query))[0] for query in keystrokes])
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def print_results(results: Dict[str, Dict[str, Dict[str, float]]]):
+    print(f"{'size':>7} {'measure':<32} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for size, measures in results.items():
+        for measure, values in measures.items():
+            print(f"{size:>7} {measure:<32} {values['count']:>6} {values['p50']:>10.3f} {values['p95']:>10.3f} "
+                  f"{values['p99']:>10.3f} {values['max']:>10.3f}")
+
+
+# Returns the descriptions of the measures slower than the baseline by more than `tolerance`.
+def compare(results: dict, baseline: dict, tolerance: float, min_ms: float) -> List[str]:
+    regressions = []
+    for size, measures in results.items():
+        for measure, values in measures.items():
+            reference = baseline.get(size, {}).get(measure)
+            if reference is None:
+                continue
+            for stat in ("p50", "p95"):
+                # Ignore differences too small to be measured reliably
+                if values[stat] > reference[stat] * (1 + tolerance) and values[stat] - reference[stat] > min_ms:
+                    regressions.append(
+                        f"{size} {measure} {stat}: {values[stat]:.3f} ms (baseline {reference[stat]:.3f} ms)"
+                    )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated numbers of recent items")
+    parser.add_argument("--projects", type=int, default=150, help="number of projects")
+    parser.add_argument("--worktrees", type=int, default=2, help="linked worktrees per project, 0 to disable extraction")
+    parser.add_argument("--padding-kb", type=int, default=1024, help="unrelated data added to storage.json")
+    parser.add_argument("--keystrokes", type=int, default=500, help="number of measured queries")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of the other measures")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--save", type=Path, help="save the results as baseline")
+    parser.add_argument("--compare", type=Path, help="compare the results with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown with --compare")
+    parser.add_argument("--min-ms", type=float, default=0.05, help="ignored absolute slowdown with --compare")
+    args = parser.parse_args()
+
+    results = {}
+    for size in map(int, args.sizes.split(",")):
+        results[str(size)] = bench_size(args, size)
+    print_results(results)
+
+    for path in (args.json, args.save):
+        if path:
+            path.write_text(json.dumps(results, indent=2))
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance, args.min_ms)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regression")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())